@@ -4,87 +4,92 @@ Module for analysing codon changes.
 
 import json
 import pickle
-# from itertools import product  # For generating all possible synonymous codon changes
+import time
 # from collections import defaultdict
-# from typing import List
+from typing import List
+import numpy as np
+from numpy.typing import ArrayLike
 from pandas import DataFrame
+from codon_encoding import codon_change_positions, encode_codon_changes, table_codon_change_codes
+from genetic_code import STANDARD_CODE, GeneticCode
+from sfs_io import SFS_FILE_SUFFIX, save_sfs
 
 
-# # Dictionary and list
-# genetic_code = {
-#     'TTT': 'F', 'TTC': 'F', 'TTA': 'L', 'TTG': 'L', 'CTT': 'L', 'CTC': 'L', 'CTA': 'L', 'CTG': 'L',
-#     'ATT': 'I', 'ATC': 'I', 'ATA': 'I', 'ATG': 'M', 'GTT': 'V', 'GTC': 'V', 'GTA': 'V', 'GTG': 'V',
-#     'TCT': 'S', 'TCC': 'S', 'TCA': 'S', 'TCG': 'S', 'CCT': 'P', 'CCC': 'P', 'CCA': 'P', 'CCG': 'P',
-#     'ACT': 'T', 'ACC': 'T', 'ACA': 'T', 'ACG': 'T', 'GCT': 'A', 'GCC': 'A', 'GCA': 'A', 'GCG': 'A',
-#     'TAT': 'Y', 'TAC': 'Y', 'TAA': '*', 'TAG': '*', 'CAT': 'H', 'CAC': 'H', 'CAA': 'Q', 'CAG': 'Q',
-#     'AAT': 'N', 'AAC': 'N', 'AAA': 'K', 'AAG': 'K', 'GAT': 'D', 'GAC': 'D', 'GAA': 'E', 'GAG': 'E',
-#     'TGT': 'C', 'TGC': 'C', 'TGA': '*', 'TGG': 'W', 'CGT': 'R', 'CGC': 'R', 'CGA': 'R', 'CGG': 'R',
-#     'AGT': 'S', 'AGC': 'S', 'AGA': 'R', 'AGG': 'R', 'GGT': 'G', 'GGC': 'G', 'GGA': 'G', 'GGG': 'G'
-# }
-
-
-# # Fuction to generate synonymous pairs from the genetic code
-# def generate_synonymous_pairs(genetic_code: dict) -> List[str]:
-#     """
-#     Function to generate synonymous pairs from the genetic code.
-#     """
-#     synonymous_pairs = []
-#     for codon1, codon2 in product(genetic_code.keys(), repeat=2):
-#         if codon1 != codon2 and genetic_code[codon1] == genetic_code[codon2]:
-#             synonymous_pairs.append(f"{codon1}->{codon2}")
-#     return synonymous_pairs
-
-
-# # Instantiate the synonymous pairs from the genetic code
-# # The list has 180 synonymous changes including stop codons
-# # and changes involving more than one nucleotide
-# synonymous_pairs = generate_synonymous_pairs(genetic_code)
-
-
-# The list include 134 synonymous changes involving only one nucleotide
-synonymous_1nt_pairs = ["TTT->TTC", "TTC->TTT", "CTT->CTC", "CTC->CTT", "CTT->CTA", "CTA->CTT",
-                        "CTT->CTG", "CTG->CTT", "CTA->CTC", "CTC->CTA", "CTA->CTG", "CTG->CTA",
-                        "CTC->CTG", "CTG->CTC", "CTG->TTG", "TTG->CTG", "CTA->TTA", "TTA->CTA",
-                        "TTA->TTG", "TTG->TTA", "ATT->ATC", "ATC->ATT", "ATT->ATA", "ATA->ATT",
-                        "ATA->ATC", "ATC->ATA", "GTT->GTC", "GTC->GTT", "GTT->GTA", "GTA->GTT",
-                        "GTT->GTG", "GTG->GTT", "GTC->GTA", "GTA->GTC", "GTC->GTG", "GTG->GTC",
-                        "GTA->GTG", "GTG->GTA", "TCT->TCC", "TCC->TCT", "TCT->TCA", "TCA->TCT",
-                        "TCT->TCG", "TCG->TCT", "TCC->TCA", "TCA->TCC", "TCC->TCG", "TCG->TCC",
-                        "TCA->TCG", "TCG->TCA", "AGT->AGC", "AGC->AGT", "CCT->CCC", "CCC->CCT",
-                        "CCT->CCA", "CCA->CCT", "CCT->CCG", "CCG->CCT", "CCC->CCA", "CCA->CCC",
-                        "CCC->CCG", "CCG->CCC", "CCA->CCG", "CCG->CCA", "ACT->ACC", "ACC->ACT",
-                        "ACT->ACA", "ACA->ACT", "ACT->ACG", "ACG->ACT", "ACC->ACA", "ACA->ACC",
-                        "ACC->ACG", "ACG->ACC", "ACA->ACG", "ACG->ACA", "GCT->GCC", "GCC->GCT",
-                        "GCT->GCA", "GCA->GCT", "GCT->GCG", "GCG->GCT", "GCC->GCA", "GCA->GCC",
-                        "GCC->GCG", "GCG->GCC", "GCA->GCG", "GCG->GCA", "TAT->TAC", "TAC->TAT",
-                        "CAT->CAC", "CAC->CAT", "CAA->CAG", "CAG->CAA", "AAT->AAC", "AAC->AAT",
-                        "AAA->AAG", "AAG->AAA", "GAT->GAC", "GAC->GAT", "GAA->GAG", "GAG->GAA",
-                        "TGT->TGC", "TGC->TGT", "CGT->CGC", "CGC->CGT", "CGT->CGA", "CGA->CGT",
-                        "CGT->CGG", "CGG->CGT", "CGC->CGA", "CGA->CGC", "CGC->CGG", "CGG->CGC",
-                        "CGA->CGG", "CGG->CGA", "CGA->AGA", "AGA->CGA", "AGA->AGG", "AGG->AGA",
-                        "CGG->AGG", "AGG->CGG", "GGT->GGC", "GGC->GGT", "GGT->GGA", "GGA->GGT",
-                        "GGT->GGG", "GGG->GGT", "GGC->GGA", "GGA->GGC", "GGC->GGG", "GGG->GGC",
-                        "GGA->GGG", "GGG->GGA"]
-
-
-# # This code counts the number of nucleotide differences between two codons
-# # Help to check if all changes in list 2 involve only one nucleotide
-# def count_nucleotide_differences(codon1, codon2):
-#     return sum(n1 != n2 for n1, n2 in zip(codon1, codon2))
-#
-# all_single_nucleotide = all(count_nucleotide_differences(change.split('->')[0], change.split('->')[1]) == 1 for change in synonymous_pairs)
-#
-# print(f"All changes in list 2 involve only one nucleotide: {all_single_nucleotide}")
-
-
-def create_codon_change_sfs_dict(df: DataFrame, use_filter: bool) -> dict:
+def count_codon_change_sfs(
+    codon_changes: ArrayLike,
+    total_counts: ArrayLike,
+    alt_counts: ArrayLike,
+    synonymous_changes: List[str]
+) -> dict:
+    """
+    Function to count derived-count SFSs per codon change and total count
+    with whole-array operations.
+    Codon changes (strings or codon_encoding codes) are mapped to their
+    position in synonymous_changes with a lookup table, each (position,
+    total count) group gets a slice of one flat histogram, and every SNP is
+    counted in a single np.bincount pass. SNPs with a derived count outside
+    0..total count raise a ValueError. Codon changes not in
+    synonymous_changes are ignored. It returns the same nested dictionary
+    as create_codon_change_sfs_dict(), with total counts in order of first
+    appearance; codon changes are converted to strings only there.
+    """
+    codon_dict = {change: {} for change in synonymous_changes}
+
+    codes = codon_change_positions(synonymous_changes)[encode_codon_changes(codon_changes)]
+    keep = codes >= 0
+    codes = codes[keep].astype(np.int64)
+    total_counts = np.asarray(total_counts)[keep].astype(np.int64)
+    alt_counts = np.asarray(alt_counts)[keep].astype(np.int64)
+    if codes.size == 0:
+        return codon_dict
+
+    # A derived count outside 0..total count would land in another histogram
+    bad = (alt_counts < 0) | (alt_counts > total_counts)
+    if bad.any():
+        first = int(np.flatnonzero(bad)[0])
+        raise ValueError(f"{int(bad.sum())} SNPs have a derived count outside 0..total count "
+                         f"(e.g. altcount={alt_counts[first]}, totalcount={total_counts[first]})")
+
+    # Group SNPs by (codon change, total count), in order of first appearance
+    keys = codes * (int(total_counts.max()) + 1) + total_counts
+    _, first_index, group = np.unique(keys, return_index=True, return_inverse=True)
+    group = group.ravel()
+    group_codes = codes[first_index]
+    group_totals = total_counts[first_index]
+
+    # Lay out one histogram of total_count + 1 bins per group and fill all at once
+    starts = np.concatenate(([0], np.cumsum(group_totals + 1)))
+    histogram = np.bincount(starts[group] + alt_counts, minlength=starts[-1])
+
+    for g in np.argsort(first_index, kind='stable'):
+        change = synonymous_changes[group_codes[g]]
+        codon_dict[change][int(group_totals[g])] = histogram[starts[g]:starts[g + 1]].tolist()
+
+    return codon_dict
+
+
+def create_codon_change_sfs_dict(df: DataFrame, use_filter: bool, vectorized: bool = True,
+                                 code: GeneticCode = STANDARD_CODE) -> dict:
     """
     Function to create codon change dictionary of total counts
     and derived counts SFS. It filter out SNPs with exon-intron
     junctions annotation.
+    With vectorized=True (default) the SFSs are counted with
+    count_codon_change_sfs(); vectorized=False keeps the row-by-row loop.
+    Codon changes are the single-nucleotide synonymous changes of code.
     """
     # Generate all possible synonymous codon changes
-    synonymous_changes = synonymous_1nt_pairs
+    synonymous_changes = code.synonymous_1nt_pairs
+
+    if use_filter:
+        df = df[df['custom_annotation'] != 'eij']
+
+    if vectorized:
+        return count_codon_change_sfs(table_codon_change_codes(df), df['totalcount'], df['altcount'],
+                                      synonymous_changes)
+
+    # Set for constant-time membership checks
+    synonymous_changes_set = set(synonymous_changes)
 
     # Create the nested dictionary structure
     # codon_dict = {change: defaultdict(lambda: defaultdict(int)) for change in synonymous_changes}
@@ -92,15 +97,12 @@ def create_codon_change_sfs_dict(df: DataFrame, use_filter: bool) -> dict:
     for change in synonymous_changes:
         codon_dict[change] = {}
 
-    if use_filter:
-        df = df[df['custom_annotation'] != 'eij']
-
     # Fill the dictionary with data from the DataFrame
     for _, row in df.iterrows():
         codon_change = row['codon_change']
 
         # if codon_change in synonymous_changes and extra_annotation != 'eij':
-        if codon_change in synonymous_changes:
+        if codon_change in synonymous_changes_set:
             total_count = row['totalcount']
             alt_count = row['altcount']
 
@@ -112,12 +114,38 @@ def create_codon_change_sfs_dict(df: DataFrame, use_filter: bool) -> dict:
     return codon_dict
 
 
+def sfs_counting_benchmark_report(df: DataFrame, use_filter: bool = True) -> DataFrame:
+    """
+    Function to compare the row-by-row SFS counting (the previous behaviour)
+    against the vectorized counting of create_codon_change_sfs_dict().
+    It returns the run time of both and whether their SFSs are identical.
+    """
+    report = []
+    results = {}
+    for name, vectorized in (('iterrows', False), ('vectorized', True)):
+        start = time.perf_counter()
+        results[name] = create_codon_change_sfs_dict(df, use_filter, vectorized=vectorized)
+        report.append({'mode': name, 'rows': len(df), 'seconds': time.perf_counter() - start})
+
+    report = DataFrame(report)
+    report['speedup'] = report['seconds'].iloc[0] / report['seconds']
+    report['identical'] = results['iterrows'] == results['vectorized']
+    return report
+
+
 # Define the functions to save and load data
-def save_data(data: dict, pickle_file: str, json_file: str):
+def save_data(data: dict, pickle_file: str, json_file: str | None = None):
     """
-    Function to save data to pickle and json files.
+    Function to save data to a pickle file, or to the compact binary
+    results format (see sfs_io.save_sfs()) if pickle_file ends with .npz.
+    A JSON copy is written only if json_file is given.
     """
-    with open(pickle_file, 'wb') as f:
-        pickle.dump(data, f)
-    with open(json_file, 'w') as f:
-        json.dump({k: dict(v) for k, v in data.items()}, f, indent=2)
+    if pickle_file.endswith(SFS_FILE_SUFFIX):
+        save_sfs(data, pickle_file)
+    else:
+        with open(pickle_file, 'wb') as f:
+            pickle.dump(data, f)
+
+    if json_file is not None:
+        with open(json_file, 'w') as f:
+            json.dump({k: dict(v) for k, v in data.items()}, f, indent=2)
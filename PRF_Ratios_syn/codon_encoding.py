@@ -0,0 +1,188 @@
+"""
+Module for integer encoding of codons and codon changes.
+A codon is a 6-bit ID (two bits per nucleotide, T=0, C=1, A=2, G=3, so IDs
+follow the order of the standard genetic code table) and a codon change
+is a uint16 code: from_id << 6 | to_id. Invalid or missing values get
+CODON_NA and CODON_CHANGE_NA. Codon change properties are precomputed
+64x64 lookup tables, so classifying an array of changes is one indexing.
+"""
+
+from itertools import product
+from typing import List
+import numpy as np
+import pandas as pd
+from numpy.typing import ArrayLike
+from genetic_code import CODONS, CODON_DISTANCE, NUCLEOTIDES, STANDARD_CODE, GeneticCode
+
+
+N_CODONS = 64
+N_CODON_CHANGES = N_CODONS * N_CODONS
+CODON_NA = N_CODONS
+CODON_CHANGE_NA = N_CODON_CHANGES
+
+CODON_CHANGES = [f"{from_codon}->{to_codon}" for from_codon, to_codon in product(CODONS, repeat=2)]
+
+# Nucleotide byte to 2-bit value, 4 for anything else. Codons are read in
+# either case; codon changes only in upper case, as the strings they replace
+_NUCLEOTIDE_BITS = np.full(256, 4, dtype=np.uint8)
+_UPPER_NUCLEOTIDE_BITS = np.full(256, 4, dtype=np.uint8)
+for _bits, _nucleotide in enumerate(NUCLEOTIDES):
+    _NUCLEOTIDE_BITS[[ord(_nucleotide), ord(_nucleotide.lower())]] = _bits
+    _UPPER_NUCLEOTIDE_BITS[ord(_nucleotide)] = _bits
+
+# Codon ID as string, with 'NA' for CODON_NA
+CODON_STRINGS = np.array(CODONS + ['NA'], dtype=object)
+# Codon change code as string, with 'NA' for CODON_CHANGE_NA
+CODON_CHANGE_STRINGS = np.array(CODON_CHANGES + ['NA'], dtype=object)
+
+# 64x64 tables indexed by [from_id, to_id]: CODON_DISTANCE (nucleotide
+# differences, from genetic_code), the code of the reverse change, and the
+# synonymy tables of the standard genetic code (see genetic_code.GeneticCode)
+REVERSE_CODE = (np.arange(N_CODONS, dtype=np.uint16)[None, :] << 6) | np.arange(N_CODONS, dtype=np.uint16)[:, None]
+SYNONYMOUS = STANDARD_CODE.synonymous
+SYNONYMOUS_1NT = STANDARD_CODE.synonymous_1nt
+
+
+def _nucleotide_bits(values: ArrayLike, width: int, columns: List[int],
+                     table: np.ndarray, arrow: bool = False) -> np.ndarray:
+    """
+    Function to get the 2-bit values of the nucleotides at columns of
+    fixed-width strings (width - 1 characters), 4 where invalid.
+    Values of another length, non-strings and missing values are invalid.
+    """
+    values = np.asarray(values, dtype=object)
+    try:
+        text = values.astype(f'S{width}')
+    except UnicodeEncodeError:
+        text = np.array([value if isinstance(value, str) and value.isascii() else ''
+                         for value in values], dtype=f'S{width}')
+    text = text.view(np.uint8).reshape(-1, width)
+
+    bits = table[text[:, columns]]
+    invalid = (text[:, width - 1] != 0) | (text[:, width - 2] == 0)
+    if arrow:
+        invalid |= (text[:, 3] != ord('-')) | (text[:, 4] != ord('>'))
+    bits[invalid] = 4
+    return bits
+
+
+def encode_codons(codons: ArrayLike) -> np.ndarray:
+    """
+    Function to encode codon strings (either case) as 6-bit codon IDs.
+    Categorical columns are encoded through their categories only.
+    Missing or invalid codons get CODON_NA.
+    """
+    if isinstance(getattr(codons, 'dtype', None), pd.CategoricalDtype):
+        categories = encode_codons(np.asarray(codons.cat.categories, dtype=object))
+        codes = np.asarray(codons.cat.codes)
+        return np.where(codes >= 0, np.append(categories, CODON_NA)[codes], CODON_NA).astype(np.uint8)
+
+    bits = _nucleotide_bits(codons, 4, [0, 1, 2], _NUCLEOTIDE_BITS)
+    ids = (bits[:, 0] << 4) | (bits[:, 1] << 2) | bits[:, 2]
+    valid = (bits < 4).all(axis=1)
+    return np.where(valid, ids, CODON_NA).astype(np.uint8)
+
+
+def encode_codon_pairs(from_ids: ArrayLike, to_ids: ArrayLike) -> np.ndarray:
+    """
+    Function to combine two arrays of codon IDs into codon change codes.
+    """
+    from_ids = np.asarray(from_ids, dtype=np.uint16)
+    to_ids = np.asarray(to_ids, dtype=np.uint16)
+    codes = (from_ids << 6) | to_ids
+    return np.where((from_ids < N_CODONS) & (to_ids < N_CODONS), codes, CODON_CHANGE_NA).astype(np.uint16)
+
+
+def encode_codon_changes(codon_changes: ArrayLike) -> np.ndarray:
+    """
+    Function to encode codon change strings ('TTT->TTC') as uint16 codes.
+    Integer arrays are taken as already encoded.
+    Missing or invalid codon changes (e.g. 'NA') get CODON_CHANGE_NA.
+    """
+    if isinstance(getattr(codon_changes, 'dtype', None), pd.CategoricalDtype):
+        categories = encode_codon_changes(np.asarray(codon_changes.cat.categories, dtype=object))
+        codes = np.asarray(codon_changes.cat.codes)
+        return np.where(codes >= 0, np.append(categories, CODON_CHANGE_NA)[codes], CODON_CHANGE_NA).astype(np.uint16)
+
+    codon_changes = np.asarray(codon_changes)
+    if np.issubdtype(codon_changes.dtype, np.integer):
+        return codon_changes.astype(np.uint16)
+
+    bits = _nucleotide_bits(codon_changes, 9, [0, 1, 2, 5, 6, 7], _UPPER_NUCLEOTIDE_BITS, arrow=True)
+    from_ids = (bits[:, 0] << 4) | (bits[:, 1] << 2) | bits[:, 2]
+    to_ids = (bits[:, 3] << 4) | (bits[:, 4] << 2) | bits[:, 5]
+    valid = (bits < 4).all(axis=1)
+    return np.where(valid, encode_codon_pairs(from_ids, to_ids), CODON_CHANGE_NA).astype(np.uint16)
+
+
+def table_codon_change_codes(df: pd.DataFrame) -> np.ndarray:
+    """
+    Function to get the codon change codes of a processed table, from its
+    codon_change_code column (see data_processing.process_main_table())
+    or, for tables without it, by encoding its codon_change strings.
+    """
+    if 'codon_change_code' in df.columns:
+        return df['codon_change_code'].to_numpy(dtype=np.uint16)
+    return encode_codon_changes(df['codon_change'])
+
+
+def decode_codons(ids: ArrayLike) -> np.ndarray:
+    """
+    Function to convert codon IDs back to strings.
+    """
+    return CODON_STRINGS[np.asarray(ids)]
+
+
+def decode_codon_changes(codes: ArrayLike) -> np.ndarray:
+    """
+    Function to convert codon change codes back to strings ('NA' for missing).
+    """
+    return CODON_CHANGE_STRINGS[np.asarray(codes)]
+
+
+def codon_change_lookup(codes: ArrayLike, table: np.ndarray, missing=False) -> np.ndarray:
+    """
+    Function to look up a 64x64 table for an array of codon change codes.
+    Missing codon changes get missing.
+    """
+    codes = np.asarray(codes, dtype=np.int64)
+    flat = np.append(table.ravel(), np.array(missing, dtype=table.dtype))
+    return flat[codes]
+
+
+def is_synonymous_change(codes: ArrayLike, single_nucleotide: bool = True,
+                         code: GeneticCode = STANDARD_CODE) -> np.ndarray:
+    """
+    Function to classify an array of codon change codes as synonymous
+    (by default only single-nucleotide changes between sense codons)
+    under a genetic code. Missing codon changes are not synonymous.
+    """
+    return codon_change_lookup(codes, code.synonymous_1nt if single_nucleotide else code.synonymous)
+
+
+def reverse_codon_changes(codes: ArrayLike) -> np.ndarray:
+    """
+    Function to get the codes of the reverse codon changes.
+    """
+    return codon_change_lookup(codes, REVERSE_CODE, missing=CODON_CHANGE_NA)
+
+
+def first_positions(codes: ArrayLike) -> np.ndarray:
+    """
+    Function to build a lookup table from codon change code to the position
+    of its first occurrence in codes (-1 if absent or CODON_CHANGE_NA).
+    """
+    positions = np.full(N_CODON_CHANGES + 1, -1, dtype=np.int64)
+    unique_codes, first = np.unique(np.asarray(codes, dtype=np.uint16), return_index=True)
+    positions[unique_codes] = first
+    positions[CODON_CHANGE_NA] = -1
+    return positions
+
+
+def codon_change_positions(codon_changes: List[str]) -> np.ndarray:
+    """
+    Function to build a lookup table from codon change code to position
+    in codon_changes (-1 if absent), so membership is a single indexing.
+    A repeated codon change maps to its first position.
+    """
+    return first_positions(encode_codon_changes(codon_changes))
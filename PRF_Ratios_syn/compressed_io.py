@@ -0,0 +1,261 @@
+"""
+Module for reading gzip and block-gzipped (BGZF) inputs, with a
+(chromosome, position) index for region queries on BGZF tables.
+"""
+
+import gzip
+import struct
+import zlib
+from bisect import bisect_right
+from typing import Dict, Iterator, Tuple
+import numpy as np
+
+
+GZIP_MAGIC = b'\x1f\x8b'
+BGZF_INDEX_SUFFIX = '.pidx.npz'
+BGZF_MAX_BLOCK_DATA = 65280
+# Empty BGZF block marking the end of file
+BGZF_EOF = bytes.fromhex('1f8b08040000000000ff0600424302001b0003000000000000000000')
+
+
+def is_gzipped(input_file: str) -> bool:
+    """
+    Function to check whether a file is gzip compressed (BGZF included)
+    from its magic bytes, whatever its suffix.
+    """
+    with open(input_file, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+
+def is_bgzf(input_file: str) -> bool:
+    """
+    Function to check whether a file is block-gzipped (BGZF):
+    a gzip member with a 'BC' extra subfield holding the block size.
+    """
+    with open(input_file, 'rb') as f:
+        header = f.read(18)
+    return (len(header) == 18 and header[:2] == GZIP_MAGIC and header[3] & 4 != 0
+            and header[12:14] == b'BC')
+
+
+def open_text(input_file: str):
+    """
+    Function to open a plain, gzip or BGZF text file for reading.
+    """
+    if is_gzipped(input_file):
+        return gzip.open(input_file, 'rt', encoding='utf-8')
+    return open(input_file, 'r', encoding='utf-8')
+
+
+def table_compression(input_file: str) -> str | None:
+    """
+    Function to get the pandas compression argument of a table,
+    so that gzipped tables are read whatever their suffix (e.g. .bgz).
+    """
+    return 'gzip' if is_gzipped(input_file) else None
+
+
+def _read_bgzf_block(f) -> Tuple[bytes, int] | None:
+    """
+    Function to read the BGZF block at the current file position.
+    It returns the decompressed data and the compressed block size,
+    or None at end of file.
+    """
+    header = f.read(12)
+    if len(header) < 12:
+        return None
+    if header[:2] != GZIP_MAGIC:
+        raise ValueError("Not a BGZF block")
+    xlen = struct.unpack('<H', header[10:12])[0]
+    extra = f.read(xlen)
+
+    # Find the BC subfield holding the block size - 1
+    block_size = None
+    i = 0
+    while i < xlen:
+        subfield_id = extra[i:i + 2]
+        subfield_length = struct.unpack('<H', extra[i + 2:i + 4])[0]
+        if subfield_id == b'BC':
+            block_size = struct.unpack('<H', extra[i + 4:i + 6])[0] + 1
+        i += 4 + subfield_length
+    if block_size is None:
+        raise ValueError("Not a BGZF block: missing BC subfield")
+
+    compressed = f.read(block_size - xlen - 20)
+    f.read(8)  # CRC32 and uncompressed size
+    return zlib.decompress(compressed, -15), block_size
+
+
+class BGZFReader:
+    """
+    Reader of BGZF files addressed by virtual offsets
+    (compressed block offset << 16 | offset within the decompressed block).
+    """
+
+    def __init__(self, input_file: str):
+        self.input_file = input_file
+        self.file = open(input_file, 'rb')
+
+    def iter_lines(self, virtual_offset: int = 0) -> Iterator[Tuple[int, bytes]]:
+        """
+        Function to iterate over (virtual offset, line) from a virtual offset.
+        """
+        block_offset, within_offset = virtual_offset >> 16, virtual_offset & 0xFFFF
+        self.file.seek(block_offset)
+        pending = b''
+        pending_offset = None
+        while True:
+            block = _read_bgzf_block(self.file)
+            if block is None:
+                break
+            data, block_size = block
+            position, within_offset = within_offset, 0
+            while position < len(data):
+                if pending_offset is None:
+                    pending_offset = (block_offset << 16) | position
+                newline = data.find(b'\n', position)
+                if newline == -1:
+                    pending += data[position:]
+                    break
+                yield pending_offset, pending + data[position:newline + 1]
+                pending = b''
+                pending_offset = None
+                position = newline + 1
+            block_offset += block_size
+        if pending:
+            yield pending_offset, pending
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> 'BGZFReader':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def write_bgzf(input_file: str, output_file: str, level: int = 6) -> None:
+    """
+    Function to block-gzip a plain or gzipped text file,
+    as bgzip does, so that it can be indexed with build_bgzf_index().
+    """
+    with open_text(input_file) as f_in, open(output_file, 'wb') as f_out:
+        buffer = b''
+        for line in f_in:
+            buffer += line.encode('utf-8')
+            while len(buffer) >= BGZF_MAX_BLOCK_DATA:
+                f_out.write(_make_bgzf_block(buffer[:BGZF_MAX_BLOCK_DATA], level))
+                buffer = buffer[BGZF_MAX_BLOCK_DATA:]
+        if buffer:
+            f_out.write(_make_bgzf_block(buffer, level))
+        f_out.write(BGZF_EOF)
+
+
+def _make_bgzf_block(data: bytes, level: int) -> bytes:
+    """
+    Function to compress data into a single BGZF block.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    block_size = len(compressed) + 26
+    header = struct.pack('<BBBBIBBHBBHH', 0x1f, 0x8b, 8, 4, 0, 0, 0xff, 6, 66, 67, 2, block_size - 1)
+    return header + compressed + struct.pack('<II', zlib.crc32(data), len(data))
+
+
+class BGZFIndex:
+    """
+    Coordinate index of a BGZF table sorted by position within chromosome.
+    For every chromosome it keeps the position and virtual offset of the
+    first line starting in each block, so a region query seeks to the
+    last indexed line before the region instead of scanning the file.
+    """
+
+    def __init__(self, chromosomes: Dict[str, Tuple[np.ndarray, np.ndarray]]):
+        self.chromosomes = chromosomes
+
+    def seek_offset(self, chrom: str, start: int) -> int | None:
+        """
+        Function to get the virtual offset to read from for a region start.
+        """
+        if chrom not in self.chromosomes:
+            return None
+        positions, offsets = self.chromosomes[chrom]
+        i = max(bisect_right(positions, start - 1) - 1, 0)
+        return int(offsets[i])
+
+    def save(self, output_file: str) -> None:
+        arrays = {}
+        for i, (chrom, (positions, offsets)) in enumerate(self.chromosomes.items()):
+            arrays[f'positions_{i}'] = positions
+            arrays[f'offsets_{i}'] = offsets
+        np.savez(output_file, chromosomes=np.array(list(self.chromosomes), dtype=str), **arrays)
+
+    @classmethod
+    def load(cls, input_file: str) -> 'BGZFIndex':
+        with np.load(input_file) as archive:
+            return cls({chrom: (archive[f'positions_{i}'], archive[f'offsets_{i}'])
+                        for i, chrom in enumerate(archive['chromosomes'].tolist())})
+
+
+def build_bgzf_index(input_file: str, chrom_field: int = 0, pos_field: int = 1,
+                     output_file: str | None = None) -> BGZFIndex:
+    """
+    Function to index a BGZF table on (chromosome, position).
+    Header, comment and malformed lines are skipped. The index is saved
+    next to the table (input_file + BGZF_INDEX_SUFFIX) unless output_file is given.
+    """
+    entries: Dict[str, Tuple[list, list]] = {}
+    last_block = None
+    last_chrom = None
+    with BGZFReader(input_file) as reader:
+        for virtual_offset, line in reader.iter_lines():
+            if line.startswith(b'#'):
+                continue
+            fields = line.split(b'\t', max(chrom_field, pos_field) + 1)
+            if len(fields) <= max(chrom_field, pos_field) or not fields[pos_field].isdigit():
+                continue
+
+            # Index the first line of every block and of every chromosome
+            block = virtual_offset >> 16
+            chrom = fields[chrom_field]
+            if block == last_block and chrom == last_chrom:
+                continue
+            positions, offsets = entries.setdefault(chrom.decode('utf-8'), ([], []))
+            positions.append(int(fields[pos_field]))
+            offsets.append(virtual_offset)
+            last_block = block
+            last_chrom = chrom
+
+    index = BGZFIndex({chrom: (np.array(positions, dtype=np.int64), np.array(offsets, dtype=np.uint64))
+                       for chrom, (positions, offsets) in entries.items()})
+    index.save(input_file + BGZF_INDEX_SUFFIX if output_file is None else output_file)
+    return index
+
+
+def fetch_region(input_file: str, chrom: str, start: int, end: int,
+                 index: BGZFIndex | None = None, chrom_field: int = 0, pos_field: int = 1) -> Iterator[str]:
+    """
+    Function to iterate over the lines of a BGZF table with
+    chrom_field == chrom and start <= pos_field <= end.
+    The index is loaded from next to the table if not given.
+    """
+    if index is None:
+        index = BGZFIndex.load(input_file + BGZF_INDEX_SUFFIX)
+    virtual_offset = index.seek_offset(chrom, start)
+    if virtual_offset is None:
+        return
+
+    chrom_bytes = chrom.encode('utf-8')
+    with BGZFReader(input_file) as reader:
+        for _, line in reader.iter_lines(virtual_offset):
+            fields = line.split(b'\t', max(chrom_field, pos_field) + 1)
+            if len(fields) <= max(chrom_field, pos_field) or not fields[pos_field].isdigit():
+                continue
+            if fields[chrom_field] != chrom_bytes:
+                break
+            position = int(fields[pos_field])
+            if position > end:
+                break
+            if position >= start:
+                yield line.decode('utf-8')
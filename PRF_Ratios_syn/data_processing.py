@@ -2,9 +2,100 @@
 Module for processing tsv files.
 """
 
-from typing import List, Tuple
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Tuple
 import pandas as pd
-from pandas import DataFrame
+from pandas import DataFrame, Series
+from codon_encoding import CODON_CHANGE_NA, decode_codon_changes, encode_codon_changes, encode_codon_pairs, encode_codons
+from compressed_io import table_compression
+from score_tracks import ScoreTrack, read_score_track
+from table_cache import ProcessedTableCache
+from table_schemas import MAIN_TABLE_DTYPES, EXTRA_ANNOTATION_DTYPES, schema_columns
+
+
+# Reading functions
+def read_main_table(main_table: str, **kwargs):
+    """
+    Function to read the main table with the declared schema:
+    only the schema columns are read, with compact dtypes.
+    Gzip and BGZF compressed tables are read directly.
+    Extra keyword arguments are passed to pd.read_table (e.g. chunksize).
+    """
+    kwargs.setdefault('compression', table_compression(main_table))
+    return pd.read_table(main_table,
+                         usecols=schema_columns(MAIN_TABLE_DTYPES),
+                         dtype=MAIN_TABLE_DTYPES,
+                         keep_default_na=True,
+                         na_values='NA',
+                         **kwargs)
+
+
+def read_extra_annotation_table(extra_annotation_table: str) -> DataFrame:
+    """
+    Function to read the custom annotation table with the declared schema.
+    """
+    return pd.read_table(extra_annotation_table,
+                         compression=table_compression(extra_annotation_table),
+                         usecols=schema_columns(EXTRA_ANNOTATION_DTYPES),
+                         dtype=EXTRA_ANNOTATION_DTYPES,
+                         keep_default_na=True,
+                         na_values='NA')
+
+
+def schema_footprint_report(main_table: str) -> DataFrame:
+    """
+    Function to compare reading the main table with inferred dtypes
+    (the previous behaviour) against reading it with the declared schema.
+    It returns the parse time and in-memory size of both reads.
+    """
+    report = []
+    readers = {
+        'inferred': lambda: pd.read_table(main_table, compression=table_compression(main_table),
+                                          low_memory=False, keep_default_na=True, na_values='NA'),
+        'schema': lambda: read_main_table(main_table)
+    }
+    for name, reader in readers.items():
+        start = time.perf_counter()
+        df = reader()
+        elapsed = time.perf_counter() - start
+        report.append({
+            'read': name,
+            'columns': df.shape[1],
+            'seconds': elapsed,
+            'memory_mb': df.memory_usage(deep=True).sum() / 1e6
+        })
+
+    report = DataFrame(report)
+    report['memory_ratio'] = report['memory_mb'] / report['memory_mb'].iloc[0]
+    report['time_ratio'] = report['seconds'] / report['seconds'].iloc[0]
+    return report
+
+
+def concat_tables(tables: Iterable[DataFrame]) -> DataFrame:
+    """
+    Function to concatenate processed tables.
+    Categorical columns are given the union of their categories first,
+    so they stay categorical instead of falling back to object.
+    """
+    tables = list(tables)
+    if not tables:
+        return DataFrame()
+
+    for column, dtype in tables[0].dtypes.items():
+        if not isinstance(dtype, pd.CategoricalDtype):
+            continue
+        if not all(isinstance(table[column].dtype, pd.CategoricalDtype) for table in tables):
+            continue
+        categories = set()
+        for table in tables:
+            categories.update(table[column].cat.categories)
+        categories = sorted(categories)
+        for table in tables:
+            table[column] = table[column].cat.set_categories(categories)
+
+    return pd.concat(tables, ignore_index=True)
 
 
 # Data processing functions
@@ -33,42 +124,150 @@ def create_codon_change(row: DataFrame) -> str:
     return f"{ref.upper()}->{alt.upper()}"
 
 
-def process_main_table(df: DataFrame, swap_pairs: List[Tuple[str, str]]) -> DataFrame:
+def swap_columns(df: DataFrame, swap_pairs: List[Tuple[str, str]]) -> DataFrame:
+    """
+    Columnar version of swap_values().
+    A single boolean mask on aainfo == 'root_alt' selects the SNPs to root,
+    and every column pair is swapped at once for all of them.
+    It returns a new dataframe; the input is left untouched.
+    """
+    df = df.copy()
+    mask = (df['aainfo'] == 'root_alt').to_numpy()
+    for col1, col2 in swap_pairs:
+        first, second = df[col1], df[col2]
+        # Paired categorical columns must share categories to be swapped
+        if isinstance(first.dtype, pd.CategoricalDtype) and isinstance(second.dtype, pd.CategoricalDtype):
+            categories = first.cat.categories.union(second.cat.categories)
+            first = first.cat.set_categories(categories)
+            second = second.cat.set_categories(categories)
+        df[col1] = second.where(mask, first)
+        df[col2] = first.where(mask, second)
+    return df
+
+
+def create_codon_change_code_column(df: DataFrame) -> Series:
+    """
+    Function to create the uint16 codon change codes (see codon_encoding)
+    from the codon columns, CODON_CHANGE_NA where either codon is missing
+    or cannot be encoded.
+    """
+    codes = encode_codon_pairs(encode_codons(df['refcodon']), encode_codons(df['altcodon']))
+    return pd.Series(codes, index=df.index, name='codon_change_code')
+
+
+def create_codon_change_column(df: DataFrame, codes: Series | None = None) -> Series:
+    """
+    Columnar version of create_codon_change().
+    Codon change codes (computed if not given) are converted to strings
+    with a single table lookup; SNPs missing either codon get 'NA'.
+    Codons that cannot be encoded (e.g. with an N) fall back to
+    vectorized string operations.
+    """
+    ref = df['refcodon']
+    alt = df['altcodon']
+    missing = (ref.isna() | alt.isna()).to_numpy()
+    codes = (create_codon_change_code_column(df) if codes is None else codes).to_numpy()
+    codon_change = pd.Series(decode_codon_changes(codes), index=df.index)
+
+    # Codon changes the encoding cannot represent are built as strings
+    unencoded = (codes == CODON_CHANGE_NA) & ~missing
+    if unencoded.any():
+        codon_change[unencoded] = (ref[unencoded].astype(str).str.upper() + '->'
+                                   + alt[unencoded].astype(str).str.upper())
+    return codon_change
+
+
+def process_main_table(
+    df: DataFrame,
+    swap_pairs: List[Tuple[str, str]],
+    columnar: bool = True
+) -> DataFrame:
     """
     Function to process main table.
+    With columnar=True (default) rooting and codon changes are computed
+    on whole columns; columnar=False keeps the original row-wise apply().
+    Both modes return the same table. Besides the codon_change strings,
+    the table carries the uint16 codon_change_code column the SFS and
+    score counters work on.
     """
+    if columnar:
+        df = swap_columns(df, swap_pairs)
+        codes = create_codon_change_code_column(df)
+        df['codon_change'] = create_codon_change_column(df, codes)
+        df['codon_change_code'] = codes
+        return df
+
     df = df.apply(lambda row: swap_values(row, swap_pairs), axis=1)
     df['codon_change'] = df.apply(create_codon_change, axis=1)
+    df['codon_change_code'] = encode_codon_changes(df['codon_change'])
     return df
 
 
+def processing_benchmark_report(df: DataFrame, swap_pairs: List[Tuple[str, str]]) -> DataFrame:
+    """
+    Function to compare the row-wise apply() processing of the main table
+    (the previous behaviour) against the columnar processing.
+    It returns the run time of both modes and whether their tables hold the
+    same values. Dtypes are not compared: apply() turns the compact schema
+    dtypes of read_main_table() (categories, int16, int32) into object/int64.
+    """
+    report = []
+    tables = {}
+    for name, columnar in (('apply', False), ('columnar', True)):
+        start = time.perf_counter()
+        tables[name] = process_main_table(df, swap_pairs, columnar=columnar)
+        report.append({'mode': name, 'rows': len(df), 'seconds': time.perf_counter() - start})
+
+    report = DataFrame(report)
+    report['speedup'] = report['seconds'].iloc[0] / report['seconds']
+    report['identical'] = same_values(tables['apply'], tables['columnar'])
+    return report
+
+
+def same_values(df1: DataFrame, df2: DataFrame) -> bool:
+    """
+    Function to check whether two tables hold the same values,
+    regardless of their column dtypes.
+    """
+    try:
+        pd.testing.assert_frame_equal(df1, df2, check_dtype=False, check_categorical=False)
+    except AssertionError:
+        return False
+    return True
+
+
 def merge_tables(
     main_df: DataFrame,
     extra_annotation_df: DataFrame,
-    phylop_df: DataFrame,
-    phastcons_df: DataFrame
+    phylop: DataFrame | ScoreTrack,
+    phastcons: DataFrame | ScoreTrack
 ) -> DataFrame:
     """
     Function to merge tables.
-    It expects 4 tables: main_df, extra_annotation_df, phylop_df, phastcons_df.
+    It expects the main table, the custom annotation table and the phyloP
+    and phastCons scores, either as per-position tables or as ScoreTrack.
+    Scores are looked up by position in a ScoreTrack instead of merged,
+    and keep the track dtype (float32 for read_score_table() tables).
     It returns a merged dataframe.
     """
-    
+
     # Merge with custom_annotation table
     merged_df = pd.merge(main_df, extra_annotation_df, left_on=['chrom', 'pos'], right_on=['chrom', 'position'], how='left')
+    merged_df = merged_df.drop(columns=['position'])
 
-    # Merge with phyloP table
-    merged_df = pd.merge(merged_df, phylop_df, left_on=['chrom', 'pos'], right_on=['chromosome', 'position'], how='left', suffixes=('', '_phylop'))
-
-    # Merge with score2 table
-    merged_df = pd.merge(merged_df, phastcons_df, left_on=['chrom', 'pos'], right_on=['chromosome', 'position'], how='left', suffixes=('', '_phastcons'))
-
-    # Step 4: Clean up column names
-    merged_df = merged_df.drop(columns=['position', 'chromosome', 'start', 'step', 'span', 'position_phylop','chromosome_phastcons', 'start_phastcons', 'step_phastcons', 'span_phastcons', 'position_phastcons'])
-    merged_df = merged_df.rename(columns={'score': 'phyloP', 'score_phastcons': 'phastCons'})
+    # Annotate phyloP and phastCons scores
+    if isinstance(phylop, DataFrame):
+        phylop = ScoreTrack.from_dataframe(phylop, name='phyloP')
+    if isinstance(phastcons, DataFrame):
+        phastcons = ScoreTrack.from_dataframe(phastcons, name='phastCons')
+    merged_df['phyloP'] = phylop.lookup(merged_df['chrom'], merged_df['pos'])
+    merged_df['phastCons'] = phastcons.lookup(merged_df['chrom'], merged_df['pos'])
 
     # Fill NaN values in custom_annotation, phyloP, and phastCons columns with 'NA'
     columns_to_fill = ['custom_annotation', 'phyloP', 'phastCons']
+    if isinstance(merged_df['custom_annotation'].dtype, pd.CategoricalDtype):
+        categories = set(merged_df['custom_annotation'].cat.categories) | {'NA'}
+        merged_df['custom_annotation'] = merged_df['custom_annotation'].cat.set_categories(sorted(categories))
     merged_df[columns_to_fill] = merged_df[columns_to_fill].fillna('NA')
 
     return merged_df
@@ -78,40 +277,130 @@ def process_chromosome(
     main_table: str,
     extra_annotation_table: str,
     phylop_file, phastcons_file: str,
-    swap_pairs: List[Tuple[str, str]]
+    swap_pairs: List[Tuple[str, str]],
+    chunksize: int | None = None,
+    maineffect: str | None = None
 ) -> DataFrame:
     """
     Function to process a single chromosome.
     It expects 4 files: main_table, extra_annotation_table, phylop_file, phastcons_file.
+    Score files can be CSV tables, wiggle files or binary tracks
+    made with convert_score_table().
+    With chunksize set, the main table is processed in chunks of that many
+    rows (see process_chromosome_chunks()). With maineffect set, only SNPs
+    with that main effect (e.g. 'SYNONYMOUS_CODING') are kept.
     It returns a merged dataframe.
     """
+    if chunksize is not None:
+        chunks = process_chromosome_chunks(main_table, extra_annotation_table, phylop_file, phastcons_file,
+                                           swap_pairs, chunksize, maineffect)
+        return concat_tables(chunks)
+
     # Read files
-    main_df = pd.read_table(main_table, low_memory=False, keep_default_na=True, na_values='NA')
-    extra_annotation_df = pd.read_table(extra_annotation_table, keep_default_na=True, na_values='NA')
-    phylop_df = pd.read_csv(phylop_file, sep=',')
-    phastcons_df = pd.read_csv(phastcons_file, sep=',')
+    main_df = read_main_table(main_table)
+    extra_annotation_df = read_extra_annotation_table(extra_annotation_table)
+    phylop_track = read_score_track(phylop_file, name='phyloP')
+    phastcons_track = read_score_track(phastcons_file, name='phastCons')
+
+    # Filter by main effect
+    if maineffect is not None:
+        main_df = main_df[main_df['maineffect'] == maineffect].reset_index(drop=True)
 
     # Process main table
     processed_df = process_main_table(main_df, swap_pairs)
 
     # Merge all dataframes
-    merged_df = merge_tables(processed_df, extra_annotation_df, phylop_df, phastcons_df)
+    merged_df = merge_tables(processed_df, extra_annotation_df, phylop_track, phastcons_track)
 
     return merged_df
 
 
+def process_chromosome_chunks(
+    main_table: str,
+    extra_annotation_table: str,
+    phylop_file, phastcons_file: str,
+    swap_pairs: List[Tuple[str, str]],
+    chunksize: int = 500_000,
+    maineffect: str | None = None
+) -> Iterator[DataFrame]:
+    """
+    Function to process a single chromosome in chunks.
+    The main table is read chunksize rows at a time; each chunk is rooted,
+    annotated and filtered, and yielded as soon as it is ready.
+    Peak memory is set by the chunk size rather than by the size of the main
+    table; the annotation table and score tracks are loaded once (binary
+    score tracks are memory-mapped).
+    Concatenating the chunks gives the same rows as process_chromosome().
+    """
+    # Read the annotation files once
+    extra_annotation_df = read_extra_annotation_table(extra_annotation_table)
+    phylop_track = read_score_track(phylop_file, name='phyloP')
+    phastcons_track = read_score_track(phastcons_file, name='phastCons')
+
+    with read_main_table(main_table, chunksize=chunksize) as reader:
+        for main_df in reader:
+            # Filter by main effect
+            if maineffect is not None:
+                main_df = main_df[main_df['maineffect'] == maineffect]
+            main_df = main_df.reset_index(drop=True)
+
+            # Process main table
+            processed_df = process_main_table(main_df, swap_pairs)
+
+            # Merge all dataframes
+            yield merge_tables(processed_df, extra_annotation_df, phylop_track, phastcons_track)
+
+
+def process_chromosome_cached(
+    files: Tuple[str, str, str, str],
+    swap_pairs: List[Tuple[str, str]],
+    cache: ProcessedTableCache | None = None
+) -> DataFrame:
+    """
+    Function to process a single chromosome through the processed table cache.
+    The chromosome is only processed if its inputs, swap pairs or the
+    processing code changed since it was cached.
+    """
+    if cache is None:
+        return process_chromosome(*files, swap_pairs)
+
+    key = cache.key(files, swap_pairs)
+    chromosome_data = cache.get(key)
+    if chromosome_data is None:
+        chromosome_data = process_chromosome(*files, swap_pairs)
+        cache.put(key, chromosome_data)
+    return chromosome_data
+
+
 def process_all_chromosomes(
-    chromosome_files: List[Tuple[str, str, str, str]], 
-    swap_pairs: List[Tuple[str, str]]
+    chromosome_files: List[Tuple[str, str, str, str]],
+    swap_pairs: List[Tuple[str, str]],
+    workers: int = 1,
+    cache: ProcessedTableCache | None = None
 ) -> DataFrame:
     """
     Function to process all chromosomes.
+    With workers > 1 chromosomes are processed in a pool of worker processes.
+    At most `workers` chromosomes are in flight at any time and results are
+    collected in the order of chromosome_files.
+    With a ProcessedTableCache, unchanged chromosomes are read from the cache.
     """
     all_data = []
-    for files in chromosome_files:
-        chromosome_data = process_chromosome(*files, swap_pairs)
-        all_data.append(chromosome_data)
+    if workers <= 1:
+        for files in chromosome_files:
+            chromosome_data = process_chromosome_cached(files, swap_pairs, cache)
+            all_data.append(chromosome_data)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for files in chromosome_files:
+                # Wait for the oldest chromosome before submitting a new one
+                if len(pending) >= workers:
+                    all_data.append(pending.popleft().result())
+                pending.append(executor.submit(process_chromosome_cached, files, swap_pairs, cache))
+            while pending:
+                all_data.append(pending.popleft().result())
 
     # Combine all chromosome data
-    combined_df = pd.concat(all_data, ignore_index=True)
+    combined_df = concat_tables(all_data)
     return combined_df
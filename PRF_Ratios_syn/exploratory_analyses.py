@@ -10,7 +10,9 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
 from pandas import DataFrame
-from codon_changes_dict import synonymous_1nt_pairs
+from genetic_code import STANDARD_CODE, GeneticCode
+from codon_encoding import (CODON_CHANGE_NA, codon_change_positions, encode_codon_changes, first_positions,
+                            reverse_codon_changes, table_codon_change_codes)
 
 
 def make_groupby_table(
@@ -181,7 +183,8 @@ def create_codon_stats(
         use_filter=True,
         phylop_col='phyloP',
         phastcons_col='phastCons',
-        custom_annotation_col='custom_annotation'):
+        custom_annotation_col='custom_annotation',
+        code: GeneticCode = STANDARD_CODE):
     """
     Create a dictionary of codon change statistics from a DataFrame.
 
@@ -191,6 +194,7 @@ def create_codon_stats(
     phylop_col (str): Name of the column containing phyloP scores.
     phastcons_col (str): Name of the column containing phastCons scores.
     custom_annotation_col (str): Name of the column containing custom annotations.
+    code (GeneticCode): Genetic code whose single-nucleotide synonymous changes are used.
 
     Returns:
     dict: A dictionary containing statistics for each codon change.
@@ -207,36 +211,33 @@ def create_codon_stats(
         raise ValueError(f"Missing required columns: {', '.join(missing_cols)}")
 
     # Generate all possible synonymous codon changes
-    synonymous_changes = synonymous_1nt_pairs
-
-    # Create the dictionary
-    codon_stats = {change: {'phyloP': [], 'phastCons': [], 'count': 0} for change in synonymous_changes}
+    synonymous_changes = code.synonymous_1nt_pairs
 
     if use_filter:
         df = df[df[custom_annotation_col] != 'eij']
 
-    # Fill the dictionary with data from the DataFrame
-    for _, row in df.iterrows():
-        codon_change = row['codon_change']
-
-        if codon_change in synonymous_changes:
-            phylop = row[phylop_col]
-            phastcons = row[phastcons_col]
-
-            if not np.isnan(phylop) and not np.isnan(phastcons):
-                codon_stats[codon_change]['phyloP'].append(phylop)
-                codon_stats[codon_change]['phastCons'].append(phastcons)
-                codon_stats[codon_change]['count'] += 1
-
-    # Calculate means and clean up empty entries
-    for change, scores in codon_stats.copy().items():
-        if scores['count'] == 0:
-            del codon_stats[change]
-        else:
-            scores['mean_phyloP'] = np.mean(scores['phyloP']) if scores['phyloP'] else np.nan
-            scores['mean_phastCons'] = np.mean(scores['phastCons']) if scores['phastCons'] else np.nan
-            del scores['phyloP']
-            del scores['phastCons']
+    # Map codon changes to their position in synonymous_changes via integer codes
+    positions = codon_change_positions(synonymous_changes)[table_codon_change_codes(df)]
+    # Scores filled with 'NA' by merge_tables() count as missing
+    phylop = pd.to_numeric(df[phylop_col], errors='coerce').to_numpy()
+    phastcons = pd.to_numeric(df[phastcons_col], errors='coerce').to_numpy()
+    keep = (positions >= 0) & ~np.isnan(phylop) & ~np.isnan(phastcons)
+    positions, phylop, phastcons = positions[keep], phylop[keep], phastcons[keep]
+
+    # Group the scores of every codon change, keeping the row order
+    order = np.argsort(positions, kind='stable')
+    bounds = np.searchsorted(positions[order], np.arange(len(synonymous_changes) + 1))
+
+    # Calculate means, leaving out codon changes without SNPs
+    codon_stats = {}
+    for i, change in enumerate(synonymous_changes):
+        group = order[bounds[i]:bounds[i + 1]]
+        if group.size:
+            codon_stats[change] = {
+                'count': int(group.size),
+                'mean_phyloP': np.mean(phylop[group]),
+                'mean_phastCons': np.mean(phastcons[group])
+            }
 
     return codon_stats
 
@@ -285,25 +286,42 @@ def create_mean_dict(df: DataFrame) -> dict:
     Create a dictionary with the mean phyloP and phastCons scores for each codon change.
     """
 
+    codon_changes = df['codon_change'].to_numpy()
+    codes = encode_codon_changes(codon_changes)
+    reverse_codes = reverse_codon_changes(codes)
+
+    # First row of every codon change, by code
+    first_row = first_positions(codes)
+
+    # Codon changes the encoding cannot represent are looked up as strings
+    first_row_by_string = {}
+    for i in np.flatnonzero(codes == CODON_CHANGE_NA):
+        first_row_by_string.setdefault(codon_changes[i], i)
+
+    mean_phylop = df['mean_phyloP'].to_numpy()
+    mean_phastcons = df['mean_phastCons'].to_numpy()
+    counts = df['count'].to_numpy()
+
     # Create an empty dictionary
     result = {}
 
     # Process each codon change
-    for _, row in df.iterrows():
-        codon_change = row['codon_change']
-        reverse_change = get_reverse(codon_change)
-        # directions = (codon_change, reverse_change)
-
-        if codon_change not in result:
-            # Find the reverse change in the DataFrame
-            reverse_row = df[df['codon_change'] == reverse_change]
-
-            if not reverse_row.empty:
-                result[codon_change] = {
-                    'mean_phyloP': np.mean([row['mean_phyloP'], reverse_row['mean_phyloP'].values[0]]),
-                    'mean_phastCons': np.mean([row['mean_phastCons'], reverse_row['mean_phastCons'].values[0]]),
-                    'mean_counts': np.mean([row['count'], reverse_row['count'].values[0]])
-                }
+    for i, codon_change in enumerate(codon_changes):
+        if codon_change in result:
+            continue
+
+        # Find the reverse change in the DataFrame
+        if codes[i] == CODON_CHANGE_NA:
+            j = first_row_by_string.get(get_reverse(codon_change), -1)
+        else:
+            j = first_row[reverse_codes[i]]
+
+        if j >= 0:
+            result[codon_change] = {
+                'mean_phyloP': np.mean([mean_phylop[i], mean_phylop[j]]),
+                'mean_phastCons': np.mean([mean_phastcons[i], mean_phastcons[j]]),
+                'mean_counts': np.mean([counts[i], counts[j]])
+            }
 
     return result
 
@@ -0,0 +1,143 @@
+"""
+Module for genetic code tables.
+All codon and codon change tables are generated from the genetic code
+once, at import for the standard code and on first use for the others,
+instead of being copied by hand. Codons are in TCAG order (TTT, TTC, TTA,
+TTG, TCT, ...), the order of the NCBI translation tables and of the codon
+IDs in codon_encoding. Single-nucleotide synonymous changes are listed
+in the order of the hand-written list they replace (LEGACY_1NT_ORDER).
+"""
+
+from functools import lru_cache
+from itertools import product
+from typing import Dict, List
+import numpy as np
+
+
+NUCLEOTIDES = 'TCAG'
+CODONS = [''.join(codon) for codon in product(NUCLEOTIDES, repeat=3)]
+STOP = '*'
+
+# NCBI translation tables: amino acid of every codon in TCAG order
+GENETIC_CODES = {
+    1: ('Standard', 'FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG'),
+    2: ('Vertebrate Mitochondrial', 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSS**VVVVAAAADDEEGGGG'),
+    3: ('Yeast Mitochondrial', 'FFLLSSSSYY**CCWWTTTTPPPPHHQQRRRRIIMMTTTTNNKKSSRRVVVVAAAADDEEGGGG'),
+    4: ('Mold Mitochondrial', 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG'),
+    5: ('Invertebrate Mitochondrial', 'FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSSSSVVVVAAAADDEEGGGG')
+}
+
+# Number of nucleotide differences between two codons (64x64)
+_codon_digits = np.array([[NUCLEOTIDES.index(n) for n in codon] for codon in CODONS])
+CODON_DISTANCE = (_codon_digits[:, None, :] != _codon_digits[None, :, :]).sum(axis=2).astype(np.uint8)
+
+
+# Order of the single-nucleotide synonymous changes of the hand-written
+# list these tables replace: amino acids as in the textbook codon table,
+# every change below followed by its reverse. SFS dictionaries, codon
+# statistics rows and numbered codon changes keep this order.
+LEGACY_1NT_ORDER = (
+    "TTT->TTC", "CTT->CTC", "CTT->CTA", "CTT->CTG", "CTA->CTC", "CTA->CTG", "CTC->CTG", "CTG->TTG",
+    "CTA->TTA", "TTA->TTG", "ATT->ATC", "ATT->ATA", "ATA->ATC", "GTT->GTC", "GTT->GTA", "GTT->GTG",
+    "GTC->GTA", "GTC->GTG", "GTA->GTG", "TCT->TCC", "TCT->TCA", "TCT->TCG", "TCC->TCA", "TCC->TCG",
+    "TCA->TCG", "AGT->AGC", "CCT->CCC", "CCT->CCA", "CCT->CCG", "CCC->CCA", "CCC->CCG", "CCA->CCG",
+    "ACT->ACC", "ACT->ACA", "ACT->ACG", "ACC->ACA", "ACC->ACG", "ACA->ACG", "GCT->GCC", "GCT->GCA",
+    "GCT->GCG", "GCC->GCA", "GCC->GCG", "GCA->GCG", "TAT->TAC", "CAT->CAC", "CAA->CAG", "AAT->AAC",
+    "AAA->AAG", "GAT->GAC", "GAA->GAG", "TGT->TGC", "CGT->CGC", "CGT->CGA", "CGT->CGG", "CGC->CGA",
+    "CGC->CGG", "CGA->CGG", "CGA->AGA", "AGA->AGG", "CGG->AGG", "GGT->GGC", "GGT->GGA", "GGT->GGG",
+    "GGC->GGA", "GGC->GGG", "GGA->GGG"
+)
+_LEGACY_1NT_RANK = {}
+for _rank, _change in enumerate(LEGACY_1NT_ORDER):
+    _LEGACY_1NT_RANK[_change] = (_rank, 0)
+    _LEGACY_1NT_RANK['->'.join(_change.split('->')[::-1])] = (_rank, 1)
+
+
+def _change_strings(matrix: np.ndarray) -> List[str]:
+    """
+    Function to list the codon changes of a 64x64 boolean matrix,
+    in codon order of the source then the target codon.
+    """
+    return [f"{CODONS[i]}->{CODONS[j]}" for i, j in zip(*np.nonzero(matrix))]
+
+
+def _legacy_1nt_order(changes: List[str]) -> List[str]:
+    """
+    Function to sort single-nucleotide codon changes in LEGACY_1NT_ORDER.
+    Changes absent from it (in non-standard codes) follow in their given order.
+    """
+    return sorted(changes, key=lambda change: _LEGACY_1NT_RANK.get(change, (len(LEGACY_1NT_ORDER), 0)))
+
+
+class GeneticCode:
+    """
+    Tables derived from one genetic code.
+    Membership and classification are array lookups indexed by codon
+    (0-63, see codon_index) or by pair of codons, and sets for strings.
+    """
+
+    def __init__(self, table_id: int, name: str, amino_acids: str):
+        self.table_id = table_id
+        self.name = name
+        self.codon_table: Dict[str, str] = dict(zip(CODONS, amino_acids))
+        self.codon_index: Dict[str, int] = {codon: i for i, codon in enumerate(CODONS)}
+
+        # Amino acid and amino-acid class (0-20, stops last) of every codon
+        self.amino_acids = np.array(list(amino_acids))
+        classes = sorted(set(amino_acids), key=lambda aa: (aa == STOP, aa))
+        self.amino_acid_classes = classes
+        self.amino_acid_class = np.array([classes.index(aa) for aa in amino_acids], dtype=np.uint8)
+        self.is_stop = self.amino_acids == STOP
+
+        # 64x64 boolean matrices indexed by [from codon, to codon]
+        same_class = self.amino_acid_class[:, None] == self.amino_acid_class[None, :]
+        sense = ~self.is_stop[:, None] & ~self.is_stop[None, :]
+        # Synonymous changes between different codons, stop to stop included
+        self.synonymous = same_class & (CODON_DISTANCE > 0)
+        # Synonymous changes of a single nucleotide between sense codons
+        self.synonymous_1nt = self.synonymous & (CODON_DISTANCE == 1) & sense
+
+        # Codon change lists, sets and reverse pairs
+        self.synonymous_pairs = _change_strings(self.synonymous)
+        self.synonymous_1nt_pairs = _legacy_1nt_order(_change_strings(self.synonymous_1nt))
+        self.synonymous_pairs_set = frozenset(self.synonymous_pairs)
+        self.synonymous_1nt_pairs_set = frozenset(self.synonymous_1nt_pairs)
+        self.reverse_pairs: Dict[str, str] = {change: '->'.join(change.split('->')[::-1])
+                                              for change in self.synonymous_pairs}
+
+    def translate(self, codon: str) -> str:
+        """
+        Function to get the amino acid of a codon ('*' for stops).
+        """
+        return self.codon_table[codon.upper()]
+
+    def is_synonymous(self, from_codon: str, to_codon: str) -> bool:
+        """
+        Function to check whether a codon change is synonymous.
+        """
+        return bool(self.synonymous[self.codon_index[from_codon.upper()], self.codon_index[to_codon.upper()]])
+
+    def __repr__(self) -> str:
+        return f"GeneticCode({self.table_id}, '{self.name}')"
+
+
+@lru_cache(maxsize=None)
+def get_genetic_code(table_id: int = 1) -> GeneticCode:
+    """
+    Function to get the tables of an NCBI genetic code (1: standard,
+    5: invertebrate mitochondrial, ...), built once and cached.
+    """
+    if table_id not in GENETIC_CODES:
+        raise ValueError(f"Unknown genetic code {table_id}. Available codes: {sorted(GENETIC_CODES)}")
+    name, amino_acids = GENETIC_CODES[table_id]
+    return GeneticCode(table_id, name, amino_acids)
+
+
+# Standard genetic code tables
+STANDARD_CODE = get_genetic_code(1)
+genetic_code = STANDARD_CODE.codon_table
+# The list has 180 synonymous changes including stop codons
+# and changes involving more than one nucleotide
+synonymous_pairs = STANDARD_CODE.synonymous_pairs
+# The list has 134 synonymous changes involving only one nucleotide
+synonymous_1nt_pairs = STANDARD_CODE.synonymous_1nt_pairs
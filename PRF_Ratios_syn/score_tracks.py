@@ -0,0 +1,360 @@
+"""
+Module for per-base conservation score tracks (phyloP, phastCons).
+"""
+
+import json
+import struct
+from array import array
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from numpy.typing import ArrayLike
+from pandas import DataFrame
+from compressed_io import open_text, table_compression
+from table_schemas import SCORE_TABLE_DTYPES, schema_columns
+
+
+# Binary score track format: magic, header length, JSON header,
+# then for every chromosome a score array and a packed coverage mask
+SCORE_TRACK_MAGIC = b'PRFTRACK'
+SCORE_TRACK_SUFFIX = '.track'
+SCORE_TRACK_ALIGNMENT = 64
+WIGGLE_SUFFIXES = ('.wig', '.wig.gz', '.wig.bgz', '.wigFix', '.wigFix.gz', '.wigFix.bgz')
+
+
+class ScoreTrack:
+    """
+    Per-chromosome lookup table of per-base scores.
+    Each chromosome is stored as a dense score array indexed by
+    position - offset, so annotating SNPs is a direct array indexing
+    instead of a hash join. Positions without a score hold NaN.
+    """
+
+    def __init__(self, name: str = 'score'):
+        self.name = name
+        self.chromosomes: Dict[str, Tuple[int, np.ndarray]] = {}
+        self.masks: Dict[str, np.ndarray] = {}
+
+    def add_chromosome(
+        self,
+        chrom: str,
+        positions: ArrayLike,
+        scores: ArrayLike,
+        dtype=np.float32
+    ) -> None:
+        """
+        Function to add the scores of a chromosome from
+        paired position and score arrays.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        scores = np.asarray(scores, dtype=dtype)
+        if positions.size == 0:
+            return
+
+        offset = int(positions.min())
+        dense = np.full(int(positions.max()) - offset + 1, np.nan, dtype=dtype)
+        dense[positions - offset] = scores
+        self.chromosomes[chrom] = (offset, dense)
+
+    def set_chromosome(
+        self,
+        chrom: str,
+        offset: int,
+        scores: np.ndarray,
+        mask: np.ndarray | None = None
+    ) -> None:
+        """
+        Function to set an already dense score array of a chromosome,
+        where scores[i] is the score of position offset + i.
+        An optional bit-packed coverage mask flags positions with a score.
+        """
+        self.chromosomes[chrom] = (offset, scores)
+        if mask is not None:
+            self.masks[chrom] = mask
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Score dtype of the track (float32 if it has no chromosome).
+        """
+        if not self.chromosomes:
+            return np.dtype(np.float32)
+        return np.result_type(*(scores.dtype for _, scores in self.chromosomes.values()))
+
+    def coverage(self, chrom: str) -> np.ndarray:
+        """
+        Function to get the bit-packed coverage mask of a chromosome.
+        """
+        if chrom in self.masks:
+            return self.masks[chrom]
+        return np.packbits(~np.isnan(self.chromosomes[chrom][1]))
+
+    def _resolve(self, chrom: str, match_chr_prefix: bool = False) -> str | None:
+        """
+        Function to find the track chromosome of a chromosome name.
+        Names must match exactly, as in a (chrom, pos) merge, unless
+        match_chr_prefix is set: then '2L' also matches 'chr2L' and back.
+        """
+        if chrom in self.chromosomes:
+            return chrom
+        if not match_chr_prefix:
+            return None
+        alias = chrom[3:] if chrom.startswith('chr') else f'chr{chrom}'
+        if alias in self.chromosomes:
+            return alias
+        return None
+
+    def lookup_chromosome(self, chrom: str, positions: ArrayLike, match_chr_prefix: bool = False) -> np.ndarray:
+        """
+        Function to get the scores of positions on one chromosome.
+        Positions outside the track, or on chromosomes it does not have, get NaN.
+        See _resolve() for match_chr_prefix.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        result = np.full(positions.shape, np.nan, dtype=self.dtype)
+
+        key = self._resolve(str(chrom), match_chr_prefix)
+        if key is None:
+            return result
+
+        offset, scores = self.chromosomes[key]
+        index = positions - offset
+        inside = (index >= 0) & (index < len(scores))
+        if key in self.masks:
+            covered = index[inside]
+            covered = (self.masks[key][covered >> 3] >> (7 - (covered & 7))) & 1
+            inside[inside] = covered.astype(bool)
+        result[inside] = scores[index[inside]]
+        return result
+
+    def lookup(self, chroms: ArrayLike, positions: ArrayLike, match_chr_prefix: bool = False) -> np.ndarray:
+        """
+        Function to get the scores of (chrom, pos) pairs.
+        It returns an array of the track dtype (scores are not widened, so
+        float32 scores keep their value) aligned with the input, NaN where missing.
+        Chromosome names must match exactly unless match_chr_prefix is set
+        (e.g. to use a UCSC 'chr2L' track with '2L' SNP tables).
+        """
+        chroms = np.asarray(chroms, dtype=object)
+        positions = np.asarray(positions, dtype=np.int64)
+        result = np.full(positions.shape, np.nan, dtype=self.dtype)
+
+        for chrom in dict.fromkeys(chroms):
+            selected = chroms == chrom
+            result[selected] = self.lookup_chromosome(chrom, positions[selected], match_chr_prefix)
+        return result
+
+    @classmethod
+    def from_dataframe(
+        cls,
+        df: DataFrame,
+        name: str = 'score',
+        chrom_col: str = 'chromosome',
+        pos_col: str = 'position',
+        score_col: str = 'score',
+        dtype=None
+    ) -> 'ScoreTrack':
+        """
+        Function to build a score track from a per-position table,
+        such as the phyloP and phastCons CSV files.
+        By default the scores keep the dtype of score_col.
+        """
+        track = cls(name)
+        dtype = df[score_col].dtype if dtype is None else dtype
+        for chrom, group in df.groupby(chrom_col, sort=False, observed=True):
+            track.add_chromosome(str(chrom), group[pos_col].to_numpy(), group[score_col].to_numpy(), dtype)
+        return track
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the score arrays.
+        """
+        return sum(scores.nbytes for _, scores in self.chromosomes.values())
+
+
+def _aligned(position: int) -> int:
+    """
+    Function to round a file position up to the next aligned boundary.
+    """
+    return -(-position // SCORE_TRACK_ALIGNMENT) * SCORE_TRACK_ALIGNMENT
+
+
+def save_score_track(track: ScoreTrack, output_file: str, dtype=np.float32) -> None:
+    """
+    Function to write a score track to the binary format.
+    Every chromosome is stored as a contiguous score array followed by
+    a bit-packed coverage mask, both aligned so they can be memory-mapped.
+    """
+    dtype = np.dtype(dtype)
+
+    # Lay out the sections of every chromosome
+    entries = []
+    for chrom, (offset, scores) in track.chromosomes.items():
+        entries.append({'chrom': chrom, 'offset': offset, 'length': len(scores)})
+
+    # The header size depends on the section offsets, so iterate until stable
+    header_size = 0
+    while True:
+        position = _aligned(len(SCORE_TRACK_MAGIC) + 8 + header_size)
+        for entry in entries:
+            entry['data_start'] = position
+            position = _aligned(position + entry['length'] * dtype.itemsize)
+            entry['mask_start'] = position
+            position = _aligned(position + -(-entry['length'] // 8))
+        header = json.dumps({
+            'version': 1,
+            'name': track.name,
+            'dtype': dtype.str,
+            'chromosomes': entries
+        }).encode('utf-8')
+        if len(header) == header_size:
+            break
+        header_size = len(header)
+
+    with open(output_file, 'wb') as f:
+        f.write(SCORE_TRACK_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for entry in entries:
+            _, scores = track.chromosomes[entry['chrom']]
+            f.seek(entry['data_start'])
+            f.write(np.ascontiguousarray(scores, dtype=dtype).tobytes())
+            f.seek(entry['mask_start'])
+            f.write(track.coverage(entry['chrom']).tobytes())
+
+
+def load_score_track(input_file: str, mmap: bool = True) -> ScoreTrack:
+    """
+    Function to open a binary score track.
+    With mmap=True the score arrays are np.memmap views, so only the pages
+    holding the looked-up positions are read, and processes opening the
+    same file share the page cache.
+    """
+    with open(input_file, 'rb') as f:
+        if f.read(len(SCORE_TRACK_MAGIC)) != SCORE_TRACK_MAGIC:
+            raise ValueError(f"{input_file} is not a binary score track")
+        (header_size,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size).decode('utf-8'))
+
+    dtype = np.dtype(header['dtype'])
+    track = ScoreTrack(header['name'])
+    for entry in header['chromosomes']:
+        length = entry['length']
+        mask_length = -(-length // 8)
+        if mmap:
+            scores = np.memmap(input_file, dtype=dtype, mode='r', offset=entry['data_start'], shape=(length,))
+            mask = np.memmap(input_file, dtype=np.uint8, mode='r', offset=entry['mask_start'], shape=(mask_length,))
+        else:
+            scores = np.fromfile(input_file, dtype=dtype, count=length, offset=entry['data_start'])
+            mask = np.fromfile(input_file, dtype=np.uint8, count=mask_length, offset=entry['mask_start'])
+        track.set_chromosome(entry['chrom'], entry['offset'], scores, mask)
+    return track
+
+
+def read_score_table(input_file: str) -> DataFrame:
+    """
+    Function to read a per-position score table with the declared schema:
+    chromosome, position and float32 score only.
+    Gzip and BGZF compressed tables are read directly.
+    """
+    return pd.read_csv(input_file,
+                       sep=',',
+                       compression=table_compression(input_file),
+                       usecols=schema_columns(SCORE_TABLE_DTYPES),
+                       dtype=SCORE_TABLE_DTYPES)
+
+
+def convert_score_table(input_file: str, output_file: str, name: str = 'score', dtype=np.float32) -> None:
+    """
+    Function to convert a per-position score table
+    (e.g. dm6.phyloP27way_chr2L.csv) to the binary format.
+    This is meant to be run once per track.
+    """
+    df = read_score_table(input_file)
+    track = ScoreTrack.from_dataframe(df, name=name, dtype=dtype)
+    save_score_track(track, output_file, dtype=dtype)
+
+
+def _parse_wiggle_declaration(line: str) -> Dict[str, str]:
+    """
+    Function to parse the key=value fields of a fixedStep/variableStep line.
+    """
+    fields = {}
+    for item in line.split()[1:]:
+        key, _, value = item.partition('=')
+        fields[key] = value
+    return fields
+
+
+def read_wiggle(input_file: str, name: str = 'score', dtype=np.float32) -> ScoreTrack:
+    """
+    Function to read a UCSC fixedStep/variableStep wiggle file
+    (optionally gzip or BGZF compressed) straight into a score track.
+    Values are streamed into typed buffers per declaration block and
+    written to one dense array per chromosome; no per-position table
+    is ever built. Wiggle coordinates are 1-based, as in the CSV tables.
+    """
+    # Blocks per chromosome: (positions or (start, step), span, values)
+    blocks: Dict[str, List[Tuple[object, int, array]]] = {}
+    positions = None
+    values = None
+
+    with open_text(input_file) as f:
+        for line in f:
+            if line.startswith('fixedStep') or line.startswith('variableStep'):
+                fields = _parse_wiggle_declaration(line)
+                span = int(fields.get('span', 1))
+                values = array('d')
+                if line.startswith('fixedStep'):
+                    positions = None
+                    layout = (int(fields['start']), int(fields.get('step', 1)))
+                else:
+                    positions = array('q')
+                    layout = positions
+                blocks.setdefault(fields['chrom'], []).append((layout, span, values))
+            elif line.startswith(('track', 'browser', '#')) or not line.strip():
+                continue
+            elif positions is None:
+                values.append(float(line))
+            else:
+                position, value = line.split()
+                positions.append(int(position))
+                values.append(float(value))
+
+    track = ScoreTrack(name)
+    for chrom, chrom_blocks in blocks.items():
+        # Expand every block to its first-base positions
+        expanded = []
+        for layout, span, block_values in chrom_blocks:
+            if isinstance(layout, array):
+                starts = np.frombuffer(layout, dtype=np.int64)
+            else:
+                start, step = layout
+                starts = start + step * np.arange(len(block_values), dtype=np.int64)
+            expanded.append((starts, span, np.frombuffer(block_values, dtype=np.float64)))
+
+        offset = min(int(starts.min()) for starts, _, _ in expanded if starts.size)
+        end = max(int(starts.max()) + span for starts, span, _ in expanded if starts.size)
+        dense = np.full(end - offset, np.nan, dtype=dtype)
+        for starts, span, block_values in expanded:
+            for shift in range(span):
+                dense[starts + shift - offset] = block_values
+        track.set_chromosome(chrom, offset, dense)
+    return track
+
+
+def read_score_track(input_file: str, name: str = 'score') -> ScoreTrack:
+    """
+    Function to read a score track from any supported source:
+    a binary track (memory-mapped), a fixedStep/variableStep wiggle file
+    or a per-position CSV table.
+    """
+    if str(input_file).endswith(SCORE_TRACK_SUFFIX):
+        return load_score_track(input_file)
+
+    if str(input_file).endswith(WIGGLE_SUFFIXES):
+        return read_wiggle(input_file, name=name)
+
+    df = read_score_table(input_file)
+    return ScoreTrack.from_dataframe(df, name=name)
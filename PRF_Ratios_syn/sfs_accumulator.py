@@ -0,0 +1,110 @@
+"""
+Mergeable accumulator of codon change SFS counts.
+"""
+
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+from pandas import DataFrame
+from codon_analyses import count_codon_change_sfs
+from codon_encoding import table_codon_change_codes
+from genetic_code import STANDARD_CODE, GeneticCode
+from sfs_container import CodonChangeSFS
+from sfs_io import load_sfs, save_sfs
+
+
+class SFSAccumulator:
+    """
+    Running totals of codon change SFSs.
+    SFS counts are additive, so processed chunks or chromosomes can be
+    ingested one at a time, and accumulators built on different shards or
+    machines can be merged (merge is associative and commutative) or saved
+    and resumed. to_dict() gives the same SFSs as create_codon_change_sfs_dict()
+    on the concatenated data, with sample sizes in ascending order.
+    Codon changes default to the single-nucleotide synonymous changes of code.
+    """
+
+    def __init__(self, codon_changes: List[str] | None = None, use_filter: bool = True,
+                 code: GeneticCode = STANDARD_CODE):
+        self.codon_changes = list(code.synonymous_1nt_pairs if codon_changes is None else codon_changes)
+        self.use_filter = use_filter
+        self.counts: Dict[Tuple[str, int], np.ndarray] = {}
+
+    def add_sfs_dict(self, codon_change_sfs_dict: dict) -> 'SFSAccumulator':
+        """
+        Function to add a nested SFS dictionary to the totals.
+        """
+        for change, size_data in codon_change_sfs_dict.items():
+            for size, sfs in size_data.items():
+                key = (change, int(size))
+                if key not in self.counts:
+                    self.counts[key] = np.zeros(int(size) + 1, dtype=np.int64)
+                self.counts[key] += np.asarray(sfs, dtype=np.int64)
+        return self
+
+    def ingest(self, df: DataFrame) -> 'SFSAccumulator':
+        """
+        Function to add the SNPs of a processed table (a chunk or a chromosome).
+        SNPs with exon-intron junction annotation are skipped if use_filter.
+        """
+        if self.use_filter:
+            df = df[df['custom_annotation'] != 'eij']
+        return self.add_sfs_dict(count_codon_change_sfs(table_codon_change_codes(df), df['totalcount'],
+                                                        df['altcount'], self.codon_changes))
+
+    def ingest_all(self, tables: Iterable[DataFrame]) -> 'SFSAccumulator':
+        """
+        Function to add a sequence of processed tables,
+        e.g. the chunks of process_chromosome_chunks().
+        """
+        for df in tables:
+            self.ingest(df)
+        return self
+
+    def merge(self, other: 'SFSAccumulator') -> 'SFSAccumulator':
+        """
+        Function to add the totals of another accumulator to this one.
+        """
+        for change in other.codon_changes:
+            if change not in self.codon_changes:
+                self.codon_changes.append(change)
+        for (change, size), sfs in other.counts.items():
+            key = (change, size)
+            if key not in self.counts:
+                self.counts[key] = np.zeros(size + 1, dtype=np.int64)
+            self.counts[key] += sfs
+        return self
+
+    def __add__(self, other: 'SFSAccumulator') -> 'SFSAccumulator':
+        return SFSAccumulator(self.codon_changes, self.use_filter).merge(self).merge(other)
+
+    def to_dict(self) -> dict:
+        """
+        Function to get the totals as a nested SFS dictionary.
+        """
+        codon_dict = {change: {} for change in self.codon_changes}
+        for change, size in sorted(self.counts, key=lambda key: key[1]):
+            codon_dict[change][size] = self.counts[(change, size)].tolist()
+        return codon_dict
+
+    def to_container(self) -> CodonChangeSFS:
+        """
+        Function to get the totals as a CodonChangeSFS.
+        """
+        return CodonChangeSFS.from_dict(self.to_dict(), dtype=np.uint32)
+
+    def save(self, output_file: str) -> None:
+        """
+        Function to save the totals in the binary results format (.npz).
+        """
+        save_sfs(self.to_container(), output_file)
+
+    @classmethod
+    def load(cls, input_file: str, use_filter: bool = True) -> 'SFSAccumulator':
+        """
+        Function to resume an accumulator saved with save().
+        """
+        with load_sfs(input_file) as sfs_file:
+            accumulator = cls(sfs_file.codon_changes, use_filter)
+            for change in sfs_file:
+                accumulator.add_sfs_dict({change: sfs_file[change]})
+        return accumulator
@@ -2,27 +2,295 @@
 Module containing functions for performing analyses of synonymous SFSs.
 """
 
+import os
 import pickle
 import json
-from typing import List
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Tuple
 import numpy as np
+from numpy.typing import ArrayLike
+from scipy.special import gammaln
 from scipy.stats import hypergeom
+from sfs_container import CodonChangeSFS
+from sfs_io import SFS_FILE_SUFFIX, load_sfs, save_sfs
 
 
 # Load data
-def load_data(pickle_file: str) -> dict:
+def load_data(input_file: str) -> dict:
     """
-    Function to load data from pickle file.
+    Function to load data from a pickle file or a binary results file (.npz).
+    Use sfs_io.load_sfs() to read single codon changes lazily instead.
     """
-    with open(pickle_file, 'rb') as f:
+    if input_file.endswith(SFS_FILE_SUFFIX):
+        with load_sfs(input_file) as sfs_file:
+            return sfs_file.to_dict()
+
+    with open(input_file, 'rb') as f:
         return pickle.load(f)
 
 
+# Projection matrix
+def projection_matrix(
+    original_size: int,
+    sample_size: int,
+    backend: str = 'hypergeom',
+    dtype=np.float64
+) -> np.ndarray:
+    """
+    Hypergeometric projection matrix from a sample size n to a sample size m.
+    Entry [pi, si] is the probability of observing si derived copies in a
+    subsample of m gene copies when pi of the n copies are derived.
+    The (n + 1) x (m + 1) matrix is built with one vectorized call:
+    backend='hypergeom' evaluates hypergeom.pmf, backend='logspace' uses
+    projection_matrix_logspace(), which stays accurate for n in the thousands.
+    """
+    if backend == 'logspace':
+        return projection_matrix_logspace(original_size, sample_size, dtype)
+    if backend != 'hypergeom':
+        raise ValueError(f"Unknown projection backend: {backend}")
+
+    derived = np.arange(original_size + 1)[:, None]
+    sampled = np.arange(sample_size + 1)[None, :]
+    return hypergeom.pmf(sampled, original_size, derived, sample_size).astype(dtype, copy=False)
+
+
+def projection_matrix_logspace(original_size: int, sample_size: int, dtype=np.float64) -> np.ndarray:
+    """
+    Projection matrix with weights computed in log space.
+    log C(pi, si) + log C(n - pi, m - si) - log C(n, m) is summed from a table
+    of log-factorials (gammaln) and exponentiated only inside each row's
+    support max(0, m - (n - pi)) <= si <= min(pi, m); entries outside it
+    are exactly zero. Weights are computed in float64; dtype=np.float32
+    halves the memory of the returned matrix for large batches.
+    """
+    n, m = original_size, sample_size
+    derived = np.arange(n + 1)[:, None]
+    sampled = np.arange(m + 1)[None, :]
+    support = (sampled <= derived) & (m - sampled <= n - derived)
+
+    # Only the support is evaluated, so the table lookups stay in range
+    pi, si = np.broadcast_arrays(derived, sampled)
+    matrix = np.zeros((n + 1, m + 1))
+    matrix[support] = np.exp(_log_projection_weights(n, m, pi[support], si[support]))
+
+    # Each row is a distribution over si; renormalize away the rounding
+    # error shared by the row's log-factorial terms
+    matrix /= matrix.sum(axis=1, keepdims=True)
+    return matrix.astype(dtype, copy=False)
+
+
+def _log_projection_weights(original_size: int, sample_size: int, pi: np.ndarray, si: np.ndarray) -> np.ndarray:
+    """
+    Function to compute log hypergeometric weights for (pi, si) pairs
+    inside the support, from a table of log-factorials.
+    """
+    n, m = original_size, sample_size
+    log_factorial = gammaln(np.arange(n + 1) + 1.0)
+    return (log_factorial[pi] - log_factorial[si] - log_factorial[pi - si]
+            + log_factorial[n - pi] - log_factorial[m - si] - log_factorial[n - pi - m + si]
+            - (log_factorial[n] - log_factorial[m] - log_factorial[n - m]))
+
+
+# Projection matrix cache
+class ProjectionCache:
+    """
+    Cache of projection matrices keyed by (n, m), backend and dtype.
+    Matrices and banded projections (see get_banded()) share an in-memory
+    LRU bounded by max_bytes. With a
+    store_dir, matrices are also saved as .npy files and memory-mapped on
+    load, so repeated runs and notebooks skip the computation entirely.
+    Cached matrices are read-only.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 2**20, store_dir: str | None = None):
+        self.max_bytes = max_bytes
+        self.store_dir = store_dir
+        self.matrices = OrderedDict()
+        self.nbytes = 0
+        if store_dir is not None:
+            os.makedirs(store_dir, exist_ok=True)
+
+    def _store_path(self, original_size: int, sample_size: int, backend: str, dtype: str) -> str:
+        return os.path.join(self.store_dir, f'projection_{original_size}_{sample_size}_{backend}_{dtype}.npy')
+
+    def get(
+        self,
+        original_size: int,
+        sample_size: int,
+        backend: str = 'hypergeom',
+        dtype=np.float64
+    ) -> np.ndarray:
+        """
+        Function to get the projection matrix from n to m,
+        computing (and storing) it only on a cache miss.
+        """
+        key = (original_size, sample_size, backend, np.dtype(dtype).name)
+        if key in self.matrices:
+            self.matrices.move_to_end(key)
+            return self.matrices[key]
+
+        if self.store_dir is not None and os.path.exists(self._store_path(*key)):
+            # Memory-mapped read-only
+            matrix = np.load(self._store_path(*key), mmap_mode='r')
+        else:
+            matrix = projection_matrix(original_size, sample_size, backend, dtype)
+            matrix.setflags(write=False)
+            if self.store_dir is not None:
+                path = self._store_path(*key)
+                temporary_path = f"{path}.{os.getpid()}.tmp.npy"
+                np.save(temporary_path, matrix)
+                os.replace(temporary_path, path)
+
+        self._insert(key, matrix)
+        return matrix
+
+    def get_banded(
+        self,
+        original_size: int,
+        sample_size: int,
+        backend: str = 'hypergeom',
+        dtype=np.float64
+    ) -> 'BandedProjection':
+        """
+        Function to get the banded projection from n to m,
+        computing it only on a cache miss (banded projections are not stored).
+        """
+        key = (original_size, sample_size, backend, np.dtype(dtype).name, 'banded')
+        if key in self.matrices:
+            self.matrices.move_to_end(key)
+            return self.matrices[key]
+
+        banded = BandedProjection(original_size, sample_size, backend, dtype)
+        self._insert(key, banded)
+        return banded
+
+    def _insert(self, key: tuple, entry) -> None:
+        self.matrices[key] = entry
+        self.nbytes += entry.nbytes
+
+        # Evict least recently used entries beyond the byte budget
+        while self.nbytes > self.max_bytes and len(self.matrices) > 1:
+            _, evicted = self.matrices.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        """
+        Function to empty the in-memory cache (stored files are kept).
+        """
+        self.matrices.clear()
+        self.nbytes = 0
+
+
+# Shared cache used by downsample_sfs
+_projection_cache = ProjectionCache()
+
+
+def configure_projection_cache(max_bytes: int = 256 * 2**20, store_dir: str | None = None) -> ProjectionCache:
+    """
+    Function to replace the shared projection cache,
+    e.g. to change its byte budget or to enable the on-disk store.
+    """
+    global _projection_cache
+    _projection_cache = ProjectionCache(max_bytes, store_dir)
+    return _projection_cache
+
+
+def get_projection_matrix(
+    original_size: int,
+    sample_size: int,
+    backend: str = 'hypergeom',
+    dtype=np.float64
+) -> np.ndarray:
+    """
+    Function to get a projection matrix through the shared cache.
+    """
+    return _projection_cache.get(original_size, sample_size, backend, dtype)
+
+
+# Banded projection
+class BandedProjection:
+    """
+    Projection from n to m storing only the structurally non-zero band.
+    Row pi of the projection is non-zero only for
+    max(0, m - (n - pi)) <= si <= min(pi, m); each row keeps its first
+    column (`lower`) and its band values, laid out back to back in `values`
+    and located through `offsets` (a CSR-like layout). Band values are
+    computed over the support only, so the dense matrix is never built.
+    Applying it touches only the bands of the non-empty SFS bins.
+    """
+
+    def __init__(self, original_size: int, sample_size: int, backend: str = 'hypergeom', dtype=np.float64):
+        self.original_size = original_size
+        self.sample_size = sample_size
+
+        derived = np.arange(original_size + 1)
+        self.lower = np.maximum(0, sample_size - (original_size - derived))
+        upper = np.minimum(derived, sample_size)
+        self.lengths = np.maximum(upper - self.lower + 1, 0)
+        self.offsets = np.concatenate(([0], np.cumsum(self.lengths)))
+
+        # (pi, si) of every band value, in row-major order
+        pi = np.repeat(derived, self.lengths)
+        si = np.repeat(self.lower, self.lengths) + np.arange(self.offsets[-1]) - np.repeat(self.offsets[:-1], self.lengths)
+
+        if backend == 'logspace':
+            values = np.exp(_log_projection_weights(original_size, sample_size, pi, si))
+            # Renormalize each row, as projection_matrix_logspace() does
+            values /= np.repeat(np.add.reduceat(values, self.offsets[:-1]), self.lengths)
+        elif backend == 'hypergeom':
+            values = hypergeom.pmf(si, original_size, pi, sample_size)
+        else:
+            raise ValueError(f"Unknown projection backend: {backend}")
+
+        self.values = values.astype(dtype, copy=False)
+        self.values.setflags(write=False)
+
+    def apply(self, original_sfs: ArrayLike) -> np.ndarray:
+        """
+        Function to project an SFS, skipping its empty bins.
+        """
+        original_sfs = np.asarray(original_sfs)
+        rows = np.flatnonzero(original_sfs[:len(self.lengths)])
+        lengths = self.lengths[rows]
+
+        # Position of every touched band value within its row
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        values = self.values[np.repeat(self.offsets[rows], lengths) + within]
+        columns = np.repeat(self.lower[rows], lengths) + within
+        weights = np.repeat(original_sfs[rows], lengths)
+
+        return np.bincount(columns, weights=values * weights, minlength=self.sample_size + 1)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the band arrays.
+        """
+        return self.values.nbytes + self.offsets.nbytes + self.lower.nbytes + self.lengths.nbytes
+
+
+def get_banded_projection(
+    original_size: int,
+    sample_size: int,
+    backend: str = 'hypergeom',
+    dtype=np.float64
+) -> BandedProjection:
+    """
+    Function to get a banded projection from n to m through the shared cache.
+    """
+    return _projection_cache.get_banded(original_size, sample_size, backend, dtype)
+
+
 # Downsample SFS
 def downsample_sfs(
     original_sfs: list[int],
     original_size: int,
-    sample_size: int
+    sample_size: int,
+    backend: str = 'hypergeom',
+    dtype=np.float64,
+    banded: bool = False
 ) -> list[int | float]:
     """
     Project a distribution an unfolded or folded site-frequency spectrum  
@@ -33,32 +301,218 @@ def downsample_sfs(
     :param popsize: Total number of gene copies in the original distribution.
     :param sampsize: Total number of gene copies in the
     downsampled distribution (m < n).
+    :param backend: 'hypergeom' or 'logspace' (see projection_matrix()).
+    :param dtype: np.float64 or np.float32 output.
+    :param banded: project with a BandedProjection, touching only the
+    non-zero weights of non-empty bins (faster for sparse SFSs).
     :return: List of expected counts for each bin in the
     projected distribution.
+    The projection is a single vector-matrix product with a cached
+    projection_matrix().
     """
 
     # Raise error for an empty SFS
-    if not original_sfs:
+    if not len(original_sfs):
         raise ValueError("SFS is empty")
 
-    # Create an empty sample SFS with sample_size + 1 bins
-    sample_sfs = [0]*(sample_size+1)
+    if banded:
+        return get_banded_projection(original_size, sample_size, backend, dtype).apply(original_sfs).astype(dtype).tolist()
+
+    # Weights for the bins present in the original SFS
+    weights = get_projection_matrix(original_size, sample_size, backend, dtype)[:len(original_sfs)]
 
-    for pi, count in enumerate(original_sfs):
-        for si in range(sample_size+1):
-            prob = hypergeom.pmf(si, original_size, pi, sample_size)
-            sample_sfs[si] += prob * count
+    sample_sfs = np.asarray(original_sfs, dtype=dtype) @ weights
 
-    return sample_sfs
+    # Plain Python floats, so the result stays JSON serializable for any dtype
+    return sample_sfs.tolist()
 
 
 # Downsample codon change SFS in a dictionary
+def _direct_targets(
+    original_sizes: List[int], target_sample_sizes: List[int], cascade: bool
+) -> Dict[int, List[int]]:
+    """
+    Function to get the target sizes each original size n is projected to
+    directly by downsample_codon_change_sfs_batched().
+    """
+    descending = sorted(set(target_sample_sizes), reverse=True)
+    direct_targets = {}
+    for nsize in original_sizes:
+        if not cascade:
+            direct_targets[nsize] = [m for m in sorted(set(target_sample_sizes)) if nsize >= m]
+        else:
+            # Largest target <= n, plus every smaller target above the next larger one
+            direct_targets[nsize] = [m for index, m in enumerate(descending)
+                                     if nsize >= m and (index == 0 or nsize < descending[index - 1])]
+    return direct_targets
+
+
+def _projection_keys(
+    original_sizes: List[int], target_sample_sizes: List[int], cascade: bool
+) -> List[Tuple[int, int]]:
+    """
+    Function to list every (n, m) projection used by
+    downsample_codon_change_sfs_batched().
+    """
+    keys = [(nsize, m) for nsize, targets in _direct_targets(original_sizes, target_sample_sizes, cascade).items()
+            for m in targets]
+    if cascade:
+        descending = sorted(set(target_sample_sizes), reverse=True)
+        keys.extend(zip(descending, descending[1:]))
+    return list(dict.fromkeys(keys))
+
+
+def _init_projection_worker(shm_name: str, layout: dict, backend: str, dtype: str) -> None:
+    """
+    Worker initializer: map the projection matrices from shared memory
+    into the worker's projection cache, so they are never recomputed or
+    pickled per task.
+    """
+    global _projection_cache, _shared_projections
+    _shared_projections = shared_memory.SharedMemory(name=shm_name)
+
+    # Keep every shared matrix, plus the usual budget for banded projections built in the worker
+    _projection_cache = ProjectionCache(max_bytes=_shared_projections.size + _projection_cache.max_bytes)
+    for (original_size, sample_size), (offset, shape) in layout.items():
+        matrix = np.ndarray(shape, dtype=dtype, buffer=_shared_projections.buf, offset=offset)
+        matrix.setflags(write=False)
+        _projection_cache.matrices[(original_size, sample_size, backend, np.dtype(dtype).name)] = matrix
+        _projection_cache.nbytes += matrix.nbytes
+
+
+def downsample_codon_change_sfs_parallel(
+    codon_change_sfs: CodonChangeSFS,
+    target_sample_sizes: List[int],
+    workers: int,
+    cascade: bool = False,
+    backend: str = 'hypergeom',
+    dtype=np.float64,
+    banded: bool = False
+) -> Dict[int, np.ndarray]:
+    """
+    Function to run downsample_codon_change_sfs_batched() on a pool of
+    worker processes. Codon changes are split into one contiguous shard per
+    worker. Every projection matrix is computed once in the parent and
+    handed to the workers through a shared memory block. Shard results are
+    stacked back in codon change order, so the output does not depend on
+    scheduling.
+    With banded=True no dense matrix is shared; each worker builds the
+    banded projections it needs once, in its own cache.
+    """
+    # Compute every needed projection once and copy it into shared memory
+    keys = [] if banded else _projection_keys(codon_change_sfs.sample_sizes(), target_sample_sizes, cascade)
+    matrices = {key: get_projection_matrix(*key, backend, dtype) for key in keys}
+    layout, size = {}, 0
+    for key, matrix in matrices.items():
+        layout[key] = (size, matrix.shape)
+        size += matrix.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        for key, matrix in matrices.items():
+            offset, shape = layout[key]
+            np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)[:] = matrix
+
+        shards = [list(shard) for shard in np.array_split(codon_change_sfs.codon_changes, workers) if len(shard)]
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_projection_worker,
+                                 initargs=(shm.name, layout, backend, np.dtype(dtype).str)) as executor:
+            futures = [executor.submit(downsample_codon_change_sfs_batched,
+                                       codon_change_sfs.select(shard), target_sample_sizes,
+                                       cascade, backend, dtype, banded)
+                       for shard in shards]
+            results = [future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return {m: np.vstack([result[m] for result in results]) for m in target_sample_sizes}
+
+
+def downsample_codon_change_sfs_batched(
+    codon_change_sfs: CodonChangeSFS,
+    target_sample_sizes: List[int],
+    cascade: bool = False,
+    backend: str = 'hypergeom',
+    dtype=np.float64,
+    banded: bool = False
+) -> Dict[int, np.ndarray]:
+    """
+    Function to downsample all codon changes at once.
+    For every original sample size n, the SFSs of all codon changes are
+    stacked into one matrix and projected to each target size m <= n with a
+    single matrix product, accumulating into a
+    (codon changes x m + 1) matrix per target size.
+    With cascade=True only the largest target size is projected from every n.
+    Each smaller target m is then projected from the previous (larger) target
+    m', plus the original sizes m <= n < m' that m' could not include.
+    Hypergeometric projections compose, so both modes give the same result
+    up to floating-point rounding.
+    backend and dtype select the projection matrices (see projection_matrix()).
+    With banded=True each SFS is projected with a BandedProjection instead
+    of a dense matrix product (faster for large, sparse SFSs).
+    """
+    n_changes = len(codon_change_sfs.codon_changes)
+    projected = {m: np.zeros((n_changes, m + 1), dtype=dtype) for m in target_sample_sizes}
+
+    descending = sorted(set(target_sample_sizes), reverse=True)
+    direct_targets = _direct_targets(codon_change_sfs.sample_sizes(), target_sample_sizes, cascade)
+
+    for nsize in codon_change_sfs.sample_sizes():
+        entries = np.flatnonzero(codon_change_sfs.entry_sizes == nsize)
+        codes = codon_change_sfs.entry_codes[entries]
+        rows = codon_change_sfs.offsets[entries][:, None] + np.arange(nsize + 1)
+        stacked = codon_change_sfs.data[rows].astype(dtype)
+
+        for sample_size in direct_targets[nsize]:
+            # Each codon change has at most one SFS per nsize
+            projected[sample_size][codes] += _project_rows(stacked, nsize, sample_size, backend, dtype, banded)
+
+    if cascade:
+        for larger, smaller in zip(descending, descending[1:]):
+            projected[smaller] += _project_rows(projected[larger], larger, smaller, backend, dtype, banded)
+
+    return projected
+
+
+def _project_rows(
+    sfs_rows: np.ndarray,
+    original_size: int,
+    sample_size: int,
+    backend: str,
+    dtype,
+    banded: bool
+) -> np.ndarray:
+    """
+    Function to project every row of a (SFSs x n + 1) matrix to m,
+    with one dense matrix product or one banded projection per row.
+    """
+    if not banded:
+        return sfs_rows @ get_projection_matrix(original_size, sample_size, backend, dtype)
+
+    projection = get_banded_projection(original_size, sample_size, backend, dtype)
+    return np.array([projection.apply(row) for row in sfs_rows], dtype=dtype).reshape(len(sfs_rows), sample_size + 1)
+
+
 def downsample_codon_change_sfs_in_dict(
-    codon_change_sfs_dict: dict, target_sample_sizes: List[int]
+    codon_change_sfs_dict: dict,
+    target_sample_sizes: List[int],
+    batched: bool = True,
+    cascade: bool = False,
+    backend: str = 'hypergeom',
+    dtype=np.float64,
+    workers: int = 1,
+    banded: bool = False
 ) -> dict:
     """
     Function to downsample codon change SFSs in a dictionary.
     You can specify one or more target sample sizes.
+    With batched=True (default) all codon changes are projected together with
+    downsample_codon_change_sfs_batched(), optionally in cascade mode, and
+    sharded over `workers` processes when workers > 1;
+    batched=False projects each SFS one by one.
+    backend and dtype select the projection matrices (see projection_matrix()),
+    and banded=True projects with BandedProjection (see downsample_sfs()).
     """
 
     # Check if the dictionary is empty
@@ -69,6 +523,19 @@ def downsample_codon_change_sfs_in_dict(
     if not target_sample_sizes:
         raise ValueError("Target sample sizes list is empty")
 
+    if batched:
+        codon_change_sfs = CodonChangeSFS.from_dict(codon_change_sfs_dict)
+        if workers > 1:
+            projected = downsample_codon_change_sfs_parallel(codon_change_sfs, target_sample_sizes, workers,
+                                                             cascade, backend, dtype, banded)
+        else:
+            projected = downsample_codon_change_sfs_batched(codon_change_sfs, target_sample_sizes,
+                                                            cascade, backend, dtype, banded)
+        return {
+            codon_change: {sample_size: projected[sample_size][code].tolist() for sample_size in target_sample_sizes}
+            for code, codon_change in enumerate(codon_change_sfs.codon_changes)
+        }
+
     # Define the target sample sizes
     sample_sizes = target_sample_sizes
 
@@ -85,14 +552,14 @@ def downsample_codon_change_sfs_in_dict(
             # Now donwsample only SFSs with key values higher than sample_size
             for nsize, nsfs in size_data.items():
                 if nsize >= sample_size:
-                    ds_sfs = downsample_sfs(nsfs, nsize, sample_size)
+                    ds_sfs = downsample_sfs(nsfs, nsize, sample_size, backend, dtype, banded)
                     list_ds_sfs.append(ds_sfs)
 
             # Conver the list of SFS to an np.array
             sfs_array = np.array(list_ds_sfs)
 
             # Sum column-wise to get the final SFS
-            tsfs = list(np.sum(sfs_array, 0))
+            tsfs = np.sum(sfs_array, 0).tolist()
 
             targeted_sizes_sfs_dict[codon_change][sample_size] = tsfs
 
@@ -100,11 +567,18 @@ def downsample_codon_change_sfs_in_dict(
 
 
 # Define the functions to save and load data
-def save_data(data: dict, pickle_file: str, json_file: str):
+def save_data(data: dict, pickle_file: str, json_file: str | None = None):
     """
-    Function to save data to pickle and json files.
+    Function to save data to a pickle file, or to the compact binary
+    results format (see sfs_io.save_sfs()) if pickle_file ends with .npz.
+    A JSON copy is written only if json_file is given.
     """
-    with open(pickle_file, 'wb') as f:
-        pickle.dump(data, f)
-    with open(json_file, 'w') as f:
-        json.dump({k: dict(v) for k, v in data.items()}, f, indent=2)
+    if pickle_file.endswith(SFS_FILE_SUFFIX):
+        save_sfs(data, pickle_file)
+    else:
+        with open(pickle_file, 'wb') as f:
+            pickle.dump(data, f)
+
+    if json_file is not None:
+        with open(json_file, 'w') as f:
+            json.dump({k: dict(v) for k, v in data.items()}, f, indent=2)
@@ -0,0 +1,175 @@
+"""
+Array-backed container for codon change SFSs.
+"""
+
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+
+
+class CodonChangeSFS:
+    """
+    Codon change SFSs stored in one contiguous array.
+    Every (codon change, sample size n) SFS is an entry of n + 1 bins;
+    entries are laid out back to back in `data` (a ragged layout) and
+    located through `offsets`. It converts to and from the nested
+    dict[codon_change][sample_size] -> list format used across the pipeline.
+    """
+
+    def __init__(
+        self,
+        codon_changes: List[str],
+        entry_codes: np.ndarray,
+        entry_sizes: np.ndarray,
+        data: np.ndarray
+    ):
+        self.codon_changes = list(codon_changes)
+        self.entry_codes = np.asarray(entry_codes, dtype=np.int32)
+        self.entry_sizes = np.asarray(entry_sizes, dtype=np.int32)
+        self.offsets = np.concatenate(([0], np.cumsum(self.entry_sizes.astype(np.int64) + 1)))
+        self.data = np.asarray(data)
+
+        if len(self.data) != self.offsets[-1]:
+            raise ValueError("Data length does not match the entry sample sizes")
+
+        self._codes = {change: code for code, change in enumerate(self.codon_changes)}
+        self._entries = {(int(code), int(size)): entry
+                         for entry, (code, size) in enumerate(zip(self.entry_codes, self.entry_sizes))}
+
+    @classmethod
+    def from_dict(cls, codon_change_sfs_dict: dict, dtype=None) -> 'CodonChangeSFS':
+        """
+        Function to build the container from a nested SFS dictionary.
+        By default counts are packed as uint32 and projected
+        (non-integer) SFSs as float64.
+        """
+        codon_changes = list(codon_change_sfs_dict)
+        entry_codes, entry_sizes, arrays = [], [], []
+        for code, change in enumerate(codon_changes):
+            for size, sfs in codon_change_sfs_dict[change].items():
+                if len(sfs) != size + 1:
+                    raise ValueError(f"SFS of {change} with sample size {size} has {len(sfs)} bins")
+                entry_codes.append(code)
+                entry_sizes.append(size)
+                arrays.append(np.asarray(sfs))
+
+        data = np.concatenate(arrays) if arrays else np.zeros(0)
+        if dtype is None:
+            dtype = np.uint32 if np.all(np.mod(data, 1) == 0) else np.float64
+        return cls(codon_changes, entry_codes, entry_sizes, data.astype(dtype))
+
+    def to_dict(self) -> dict:
+        """
+        Function to convert the container to the nested SFS dictionary.
+        """
+        result = {change: {} for change in self.codon_changes}
+        for entry, (code, size) in enumerate(zip(self.entry_codes, self.entry_sizes)):
+            result[self.codon_changes[code]][int(size)] = self.entry(entry).tolist()
+        return result
+
+    def entry(self, entry: int) -> np.ndarray:
+        """
+        Function to get the SFS array (a view) of one entry.
+        """
+        return self.data[self.offsets[entry]:self.offsets[entry + 1]]
+
+    def __getitem__(self, key: str | Tuple[str, int]) -> np.ndarray | Dict[int, np.ndarray]:
+        """
+        sfs['TTT->TTC'] returns {sample size: SFS array},
+        sfs['TTT->TTC', 150] returns a single SFS array.
+        """
+        if isinstance(key, tuple):
+            change, size = key
+            return self.entry(self._entries[(self._codes[change], int(size))])
+
+        code = self._codes[key]
+        entries = np.flatnonzero(self.entry_codes == code)
+        return {int(self.entry_sizes[entry]): self.entry(entry) for entry in entries}
+
+    def __contains__(self, key: str | Tuple[str, int]) -> bool:
+        if isinstance(key, tuple):
+            change, size = key
+            return change in self._codes and (self._codes[change], int(size)) in self._entries
+        return key in self._codes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codon_changes)
+
+    def __len__(self) -> int:
+        return len(self.codon_changes)
+
+    def sample_sizes(self, codon_change: str | None = None) -> List[int]:
+        """
+        Function to get the sorted sample sizes present,
+        overall or for one codon change.
+        """
+        sizes = self.entry_sizes
+        if codon_change is not None:
+            sizes = sizes[self.entry_codes == self._codes[codon_change]]
+        return [int(size) for size in np.unique(sizes)]
+
+    def select(
+        self,
+        codon_changes: List[str] | None = None,
+        sample_sizes: List[int] | None = None
+    ) -> 'CodonChangeSFS':
+        """
+        Function to slice the container by codon changes and/or sample sizes.
+        It returns a new container with copies of the selected entries.
+        """
+        codon_changes = self.codon_changes if codon_changes is None else list(codon_changes)
+        codes = np.array([self._codes[change] for change in codon_changes], dtype=np.int32)
+        remap = np.full(len(self.codon_changes), -1, dtype=np.int32)
+        remap[codes] = np.arange(len(codes), dtype=np.int32)
+
+        keep = remap[self.entry_codes] >= 0
+        if sample_sizes is not None:
+            keep &= np.isin(self.entry_sizes, sample_sizes)
+        entries = np.flatnonzero(keep)
+
+        # Order entries by the requested codon change order
+        entries = entries[np.argsort(remap[self.entry_codes[entries]], kind='stable')]
+        data = [self.entry(entry) for entry in entries]
+        data = np.concatenate(data) if data else np.zeros(0, dtype=self.data.dtype)
+        return CodonChangeSFS(codon_changes, remap[self.entry_codes[entries]], self.entry_sizes[entries], data)
+
+    def sum_by_sample_size(self) -> Dict[int, np.ndarray]:
+        """
+        Function to sum the SFSs of all codon changes for each sample size.
+        """
+        result = {}
+        for size in self.sample_sizes():
+            entries = np.flatnonzero(self.entry_sizes == size)
+            rows = self.offsets[entries][:, None] + np.arange(size + 1)
+            result[size] = self.data[rows].sum(axis=0)
+        return result
+
+    def totals(self) -> Dict[str, int | float]:
+        """
+        Function to get the total number of SNPs of every codon change.
+        """
+        entry_totals = np.add.reduceat(self.data, self.offsets[:-1]) if len(self.data) else np.zeros(0)
+        per_code = np.bincount(self.entry_codes, weights=entry_totals, minlength=len(self.codon_changes))
+        cast = int if np.issubdtype(self.data.dtype, np.integer) else float
+        return {change: cast(per_code[code]) for code, change in enumerate(self.codon_changes)}
+
+    def padded(self, sample_sizes: List[int] | None = None) -> Tuple[np.ndarray, List[int]]:
+        """
+        Function to get a padded (codon change x sample size x derived count)
+        tensor and the sample sizes along its second axis.
+        Missing entries and bins beyond n are zero.
+        """
+        sample_sizes = self.sample_sizes() if sample_sizes is None else sorted(sample_sizes)
+        position = {size: index for index, size in enumerate(sample_sizes)}
+        tensor = np.zeros((len(self.codon_changes), len(sample_sizes), max(sample_sizes, default=0) + 1),
+                          dtype=self.data.dtype)
+        for entry, (code, size) in enumerate(zip(self.entry_codes, self.entry_sizes)):
+            if int(size) in position:
+                tensor[code, position[int(size)], :size + 1] = self.entry(entry)
+        return tensor, sample_sizes
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory used by the arrays of the container.
+        """
+        return self.data.nbytes + self.offsets.nbytes + self.entry_codes.nbytes + self.entry_sizes.nbytes
@@ -0,0 +1,119 @@
+"""
+Compact binary storage for codon change SFS dictionaries.
+"""
+
+import json
+from typing import Dict, Iterator, Tuple
+import numpy as np
+from sfs_container import CodonChangeSFS
+
+
+SFS_FILE_SUFFIX = '.npz'
+
+
+def save_sfs(
+    data: dict | CodonChangeSFS,
+    output_file: str,
+    compress: bool = True,
+    json_file: str | None = None
+) -> None:
+    """
+    Function to save codon change SFSs to the binary results format.
+    The file is an .npz archive with a small index (codon changes and the
+    codon change code and sample size of every entry) and one array per
+    codon change holding its SFSs back to back, so a single codon change
+    can be read without loading the rest.
+    Counts are stored as uint32 and projected SFSs as float64.
+    A JSON copy is written only if json_file is given.
+    """
+    sfs = data if isinstance(data, CodonChangeSFS) else CodonChangeSFS.from_dict(data)
+
+    arrays = {
+        'codon_changes': np.array(sfs.codon_changes, dtype=str),
+        'entry_codes': sfs.entry_codes,
+        'entry_sizes': sfs.entry_sizes
+    }
+    for code in range(len(sfs.codon_changes)):
+        entries = np.flatnonzero(sfs.entry_codes == code)
+        chunks = [sfs.entry(entry) for entry in entries]
+        arrays[f'sfs_{code}'] = np.concatenate(chunks) if chunks else np.zeros(0, dtype=sfs.data.dtype)
+
+    savez = np.savez_compressed if compress else np.savez
+    savez(output_file, **arrays)
+
+    if json_file is not None:
+        with open(json_file, 'w') as f:
+            json.dump(sfs.to_dict(), f, indent=2)
+
+
+class SFSFile:
+    """
+    Lazy reader of the binary results format.
+    Only the index is read when the file is opened; the SFSs of a codon
+    change are read the first time they are accessed.
+    sfs_file['TTT->TTC'] returns {sample size: SFS array} and
+    sfs_file['TTT->TTC', 150] a single SFS array.
+    """
+
+    def __init__(self, input_file: str):
+        self.archive = np.load(input_file)
+        self.codon_changes = self.archive['codon_changes'].tolist()
+        self.entry_codes = self.archive['entry_codes']
+        self.entry_sizes = self.archive['entry_sizes']
+        self._codes = {change: code for code, change in enumerate(self.codon_changes)}
+        self._loaded: Dict[int, Dict[int, np.ndarray]] = {}
+
+    def _load(self, code: int) -> Dict[int, np.ndarray]:
+        """
+        Function to read and split the SFSs of one codon change.
+        """
+        if code not in self._loaded:
+            sizes = self.entry_sizes[self.entry_codes == code]
+            data = self.archive[f'sfs_{code}']
+            bounds = np.cumsum(sizes.astype(np.int64) + 1)[:-1]
+            self._loaded[code] = {int(size): sfs for size, sfs in zip(sizes, np.split(data, bounds))}
+        return self._loaded[code]
+
+    def __getitem__(self, key: str | Tuple[str, int]) -> np.ndarray | Dict[int, np.ndarray]:
+        if isinstance(key, tuple):
+            change, size = key
+            return self._load(self._codes[change])[int(size)]
+        return self._load(self._codes[key])
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._codes
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codon_changes)
+
+    def __len__(self) -> int:
+        return len(self.codon_changes)
+
+    def sample_sizes(self, codon_change: str) -> list:
+        """
+        Function to get the sample sizes of a codon change from the index only.
+        """
+        return self.entry_sizes[self.entry_codes == self._codes[codon_change]].tolist()
+
+    def to_dict(self) -> dict:
+        """
+        Function to read everything into the nested SFS dictionary.
+        """
+        return {change: {size: sfs.tolist() for size, sfs in self[change].items()}
+                for change in self.codon_changes}
+
+    def close(self) -> None:
+        self.archive.close()
+
+    def __enter__(self) -> 'SFSFile':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def load_sfs(input_file: str) -> SFSFile:
+    """
+    Function to open a binary results file for lazy reading.
+    """
+    return SFSFile(input_file)
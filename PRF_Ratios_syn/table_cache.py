@@ -0,0 +1,177 @@
+"""
+On-disk cache of processed per-chromosome tables.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from typing import List, Tuple
+from pandas import DataFrame
+
+
+# Modules whose code determines the content of a processed table
+CACHED_CODE_MODULES = ['data_processing.py', 'score_tracks.py', 'table_schemas.py', 'compressed_io.py', 'codon_encoding.py',
+                       'genetic_code.py']
+CACHE_SUFFIX = '.pkl'
+# Digests of input files, keyed by path and checked against size and mtime
+DIGEST_INDEX = 'file_digests.json'
+
+
+def hash_file(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Function to hash the content of a file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version() -> str:
+    """
+    Function to hash the source of the processing modules,
+    so that changing the processing code invalidates cached tables.
+    """
+    digest = hashlib.sha256()
+    module_dir = os.path.dirname(os.path.abspath(__file__))
+    for module in CACHED_CODE_MODULES:
+        with open(os.path.join(module_dir, module), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class ProcessedTableCache:
+    """
+    Content-addressed cache of processed chromosome tables.
+    Entries are keyed by a hash of the input files, the swap pairs and the
+    processing code, and stored as pickled DataFrames (pandas pickles keep
+    the column blocks as binary arrays). The least recently used entries are
+    evicted once the cache exceeds max_bytes.
+    Input file digests are memoised by (path, size, mtime), so unchanged
+    multi-GB inputs are not hashed again on every run.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 20 * 10**9):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, files: Tuple[str, ...], swap_pairs: List[Tuple[str, str]]) -> str:
+        """
+        Function to compute the cache key of a chromosome.
+        """
+        digest = hashlib.sha256()
+        digest.update(code_version().encode('utf-8'))
+        digest.update(json.dumps([list(pair) for pair in swap_pairs]).encode('utf-8'))
+        for path in files:
+            digest.update(self.file_digest(path).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _load_digests(self) -> dict:
+        try:
+            with open(os.path.join(self.cache_dir, DIGEST_INDEX), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def file_digest(self, path: str) -> str:
+        """
+        Function to get the content hash of an input file, hashing it
+        only if its size or modification time changed since last time.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        signature = [stat.st_size, stat.st_mtime_ns]
+
+        entry = self._load_digests().get(path)
+        if entry is not None and entry['signature'] == signature:
+            return entry['digest']
+
+        digest = hash_file(path)
+
+        # Re-read the index so entries written meanwhile by other workers are kept
+        digests = self._load_digests()
+        digests[path] = {'signature': signature, 'digest': digest}
+        index_path = os.path.join(self.cache_dir, DIGEST_INDEX)
+        temporary_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'w') as f:
+            json.dump(digests, f)
+        os.replace(temporary_path, index_path)
+        return digest
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> DataFrame | None:
+        """
+        Function to get a cached table, or None if it is not cached.
+        """
+        path = self._path(key)
+
+        # The entry may be evicted by another worker at any time
+        try:
+            with open(path, 'rb') as f:
+                df = pickle.load(f)
+            # Mark the entry as recently used
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return df
+
+    def put(self, key: str, df: DataFrame) -> None:
+        """
+        Function to store a table and evict old entries if needed.
+        """
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self.evict()
+
+    def entries(self) -> List[Tuple[str, int, float]]:
+        """
+        Function to list cached entries as (path, size, last use),
+        least recently used first.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(CACHE_SUFFIX):
+                path = os.path.join(self.cache_dir, name)
+                # Skip entries removed by another worker meanwhile
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def evict(self) -> None:
+        """
+        Function to remove least recently used entries
+        until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            # Another worker evicting at the same time may remove it first
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def invalidate(self, key: str | None = None) -> None:
+        """
+        Function to remove one cached entry, or every entry if key is None.
+        """
+        paths = [self._path(key)] if key is not None else [path for path, _, _ in self.entries()]
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,47 @@
+"""
+Declared schemas of the input tables.
+Columns not listed here are not read.
+"""
+
+# Main SNP table (one row per SNP)
+MAIN_TABLE_DTYPES = {
+    'chrom': 'category',
+    'pos': 'int32',
+    'aainfo': 'category',
+    'ref': 'category',
+    'alt': 'category',
+    'refaa': 'category',
+    'altaa': 'category',
+    'refcount': 'int16',
+    'altcount': 'int16',
+    'totalcount': 'int16',
+    'refcontext': 'category',
+    'altcontext': 'category',
+    'refcontext_complrev': 'category',
+    'altcontext_complrev': 'category',
+    'refcodon': 'category',
+    'altcodon': 'category',
+    'maineffect': 'category'
+}
+
+# Custom (extra) annotation table
+EXTRA_ANNOTATION_DTYPES = {
+    'chrom': 'category',
+    'position': 'int32',
+    'custom_annotation': 'category'
+}
+
+# phyloP/phastCons per-position score tables
+SCORE_TABLE_DTYPES = {
+    'chromosome': 'category',
+    'position': 'int32',
+    'score': 'float32'
+}
+
+
+def schema_columns(dtypes: dict):
+    """
+    Function to build a usecols callable from a schema.
+    Schema columns missing from a file are ignored instead of raising.
+    """
+    return lambda column: column in dtypes
@@ -0,0 +1,371 @@
+"""
+Pandas-free streaming processing of the raw SNP .TSV tables.
+Field positions follow scripts/temp_src/process_tsv_utils.py.
+"""
+
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+from compressed_io import fetch_region, is_gzipped, open_text
+from genetic_code import synonymous_1nt_pairs
+from sfs_accumulator import SFSAccumulator
+
+
+# Field positions in the raw .TSV lines
+CHROM_FIELD = 0
+POS_FIELD = 1
+ROOT_FIELD = 2
+REFALLELE_FIELD = 3
+ALTALLELE_FIELD = 4
+REFCOUNT_FIELD = 10
+ALTCOUNT_FIELD = 11
+TOTALCOUNT_FIELD = 12
+REFCONTEXT_FIELD = 13
+ALTCONTEXT_FIELD = 14
+REFCODON_FIELD = 17
+ALTCODON_FIELD = 18
+EFFECT_FIELD = 19
+
+# Effects without codons, keyed by their mutational change instead
+# (see process_nonfunctional_snps_tsv())
+NONCODING_EFFECTS = {"INTERGENIC", "UPSTREAM", "DOWNSTREAM"}
+
+
+def count_sfs_lines(
+    lines,
+    histograms: Dict[str, Dict[int, List[int]]],
+    functional_effect: str = "SYNONYMOUS_CODING"
+) -> int:
+    """
+    Function to count rooted derived allele counts of raw .TSV lines
+    into per codon change and total count histograms, in place.
+    SNPs are rooted on the fly with make_rooted_record(). Only codon
+    changes already keys of histograms are counted. It returns the number
+    of SNPs with functional_effect.
+    """
+    n_snps = 0
+    for line in lines:
+        if line.startswith("#"):
+            continue
+
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) <= EFFECT_FIELD or fields[EFFECT_FIELD] != functional_effect:
+            continue
+        n_snps += 1
+
+        count_rooted_record(make_rooted_record(fields), histograms)
+
+    return n_snps
+
+
+def sfs_from_tsv(
+    inputfile: str,
+    functional_effect: str = "SYNONYMOUS_CODING",
+    codon_changes: List[str] | None = None
+) -> SFSAccumulator:
+    """
+    Function to reduce a raw .TSV table to codon change SFS counts in a
+    single pass, without building a DataFrame or keeping the lines.
+    Memory is bounded by the histograms (codon changes x total counts).
+    The raw table has no custom annotation, so exon-intron junction SNPs
+    are not filtered here. Gzip and BGZF compressed tables are read directly.
+    """
+    codon_changes = synonymous_1nt_pairs if codon_changes is None else codon_changes
+    histograms = {change: {} for change in codon_changes}
+
+    with open_text(inputfile) as input_file:
+        count_sfs_lines(input_file, histograms, functional_effect)
+
+    accumulator = SFSAccumulator(codon_changes, use_filter=False)
+    return accumulator.add_sfs_dict(histograms)
+
+
+def sfs_from_tsv_region(
+    inputfile: str,
+    chrom: str,
+    start: int,
+    end: int,
+    functional_effect: str = "SYNONYMOUS_CODING",
+    codon_changes: List[str] | None = None
+) -> SFSAccumulator:
+    """
+    Function to count the codon change SFSs of a region (e.g. a gene or a
+    window) of an indexed BGZF table (see compressed_io.build_bgzf_index),
+    reading only the blocks overlapping the region.
+    """
+    codon_changes = synonymous_1nt_pairs if codon_changes is None else codon_changes
+    histograms = {change: {} for change in codon_changes}
+
+    count_sfs_lines(fetch_region(inputfile, chrom, start, end), histograms, functional_effect)
+
+    accumulator = SFSAccumulator(codon_changes, use_filter=False)
+    return accumulator.add_sfs_dict(histograms)
+
+
+# Columns of the rooted SNP records passed to sinks
+ROOTED_HEADER = ["chrom", "pos", "effect", "totalcount",
+                 "refcount", "altcount", "aainfo",
+                 "refallele", "altallele",
+                 "refcodon", "altcodon", "codon_change"]
+
+
+def make_rooted_record(fields: List[str]) -> List[str]:
+    """
+    Function to make a rooted SNP record from the fields of a raw .TSV line,
+    in the layout of process_functional_snps_tsv() lines (ROOTED_HEADER).
+    Records of NONCODING_EFFECTS are keyed by their rooted mutational change
+    (central trinucleotides of the contexts), as in
+    process_nonfunctional_snps_tsv(), instead of a codon change.
+    """
+    root = fields[ROOT_FIELD]
+    snp_alleles = [fields[REFALLELE_FIELD], fields[ALTALLELE_FIELD]]
+    allele_counts = [fields[REFCOUNT_FIELD], fields[ALTCOUNT_FIELD]]
+    allele_codons = [fields[REFCODON_FIELD].upper(), fields[ALTCODON_FIELD].upper()]
+    if fields[EFFECT_FIELD] in NONCODING_EFFECTS:
+        change_keys = [fields[REFCONTEXT_FIELD][2:5], fields[ALTCONTEXT_FIELD][2:5]]
+    else:
+        change_keys = allele_codons
+
+    # Swap reference and alternative fields if root is root_alt
+    if root == "root_alt":
+        snp_alleles.reverse()
+        allele_counts.reverse()
+        allele_codons.reverse()
+        if change_keys is not allele_codons:
+            change_keys.reverse()
+
+    snp_fields = [fields[CHROM_FIELD], fields[POS_FIELD], fields[EFFECT_FIELD], fields[TOTALCOUNT_FIELD]]
+    return snp_fields + allele_counts + [root] + snp_alleles + allele_codons + ["->".join(change_keys)]
+
+
+def count_rooted_record(record: List[str], histograms: Dict[str, Dict[int, List[int]]]) -> None:
+    """
+    Function to count the derived allele count of a rooted record into the
+    histogram of its change key and total count, in place. Records whose
+    change key is not a key of histograms are skipped. Counts that are not
+    integers, or a derived count outside 0..total count, raise a ValueError,
+    as in codon_analyses.count_codon_change_sfs().
+    """
+    size_data = histograms.get(record[11])
+    if size_data is None:
+        return
+
+    try:
+        total_count, derived_count = int(record[3]), int(record[5])
+    except ValueError:
+        raise ValueError(f"SNP {record[0]}:{record[1]} ({record[11]}) has non-integer counts: "
+                         f"total {record[3]!r}, derived {record[5]!r}") from None
+    if not 0 <= derived_count <= total_count:
+        raise ValueError(f"SNP {record[0]}:{record[1]} ({record[11]}) has a derived count outside "
+                         f"0..total count: {derived_count} of {total_count}")
+
+    histogram = size_data.get(total_count)
+    if histogram is None:
+        histogram = size_data[total_count] = [0] * (total_count + 1)
+    histogram[derived_count] += 1
+
+
+class ListSink:
+    """
+    Sink keeping the rooted records in memory.
+    """
+
+    def __init__(self):
+        self.records: List[List[str]] = []
+
+    def add(self, record: List[str]) -> None:
+        self.records.append(record)
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink:
+    """
+    Sink writing the rooted records to a .TSV file with a header.
+    """
+
+    def __init__(self, outputfile: str):
+        self.output_file = open(outputfile, "w", encoding="utf-8")
+        self.output_file.write("\t".join(ROOTED_HEADER) + "\n")
+
+    def add(self, record: List[str]) -> None:
+        self.output_file.write("\t".join(record) + "\n")
+
+    def close(self) -> None:
+        self.output_file.close()
+
+
+class SFSSink:
+    """
+    Sink counting the rooted records into codon change SFS histograms.
+    """
+
+    def __init__(self, codon_changes: List[str] | None = None):
+        self.codon_changes = synonymous_1nt_pairs if codon_changes is None else codon_changes
+        self.histograms: Dict[str, Dict[int, List[int]]] = {change: {} for change in self.codon_changes}
+
+    def add(self, record: List[str]) -> None:
+        count_rooted_record(record, self.histograms)
+
+    def close(self) -> None:
+        pass
+
+    def to_accumulator(self) -> SFSAccumulator:
+        """
+        Function to get the counts as an SFSAccumulator.
+        """
+        return SFSAccumulator(self.codon_changes, use_filter=False).add_sfs_dict(self.histograms)
+
+
+def route_snps_tsv(inputfile: str, sinks: Dict[str, object]) -> Dict[str, int]:
+    """
+    Function to split a raw .TSV table by effect in a single pass.
+    Each SNP line is rooted and dispatched by its effect field to the sink
+    registered for that effect (a ListSink, FileSink, SFSSink or any object
+    with add(record) and close()); effects without a sink are only counted.
+    It returns the number of SNPs seen for every effect.
+    """
+    effect_counts = Counter()
+
+    with open_text(inputfile) as input_file:
+        for line in input_file:
+            if line.startswith("#"):
+                continue
+
+            fields = line.rstrip("\n").split("\t")
+
+            # Skip the header and incomplete lines
+            if len(fields) <= EFFECT_FIELD or not fields[POS_FIELD].isdigit():
+                continue
+
+            effect = fields[EFFECT_FIELD]
+            effect_counts[effect] += 1
+
+            sink = sinks.get(effect)
+            if sink is not None:
+                sink.add(make_rooted_record(fields))
+
+    for sink in sinks.values():
+        sink.close()
+
+    return dict(effect_counts)
+
+
+def split_byte_ranges(inputfile: str, n_ranges: int) -> List[Tuple[int, int]]:
+    """
+    Function to split a file into at most n_ranges contiguous byte ranges
+    whose boundaries fall on line starts, so every line is in exactly one range.
+    """
+    size = os.path.getsize(inputfile)
+    boundaries = [0]
+    with open(inputfile, "rb") as input_file:
+        for i in range(1, n_ranges):
+            target = size * i // n_ranges
+            if target <= boundaries[-1]:
+                continue
+            # Move to the start of the line after the one holding byte target - 1
+            input_file.seek(target - 1)
+            input_file.readline()
+            boundary = input_file.tell()
+            if boundary >= size:
+                break
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def read_byte_range(inputfile: str, start: int, end: int) -> Iterator[str]:
+    """
+    Function to iterate over the decoded lines of a byte range.
+    """
+    with open(inputfile, "rb") as input_file:
+        input_file.seek(start)
+        position = start
+        for line in input_file:
+            if position >= end:
+                break
+            position += len(line)
+            yield line.decode("utf-8")
+
+
+def _count_sfs_range(args: tuple) -> Dict[str, Dict[int, List[int]]]:
+    """
+    Function to count the SFS histograms of one byte range (worker).
+    """
+    inputfile, start, end, functional_effect, codon_changes = args
+    histograms = {change: {} for change in codon_changes}
+    count_sfs_lines(read_byte_range(inputfile, start, end), histograms, functional_effect)
+    return histograms
+
+
+def _extract_range(args: tuple) -> List[List[str]]:
+    """
+    Function to extract the rooted records of one effect from a byte range (worker).
+    """
+    inputfile, start, end, functional_effect = args
+    records = []
+    for line in read_byte_range(inputfile, start, end):
+        if line.startswith("#"):
+            continue
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) <= EFFECT_FIELD or fields[EFFECT_FIELD] != functional_effect:
+            continue
+        records.append(make_rooted_record(fields))
+    return records
+
+
+def sfs_from_tsv_parallel(
+    inputfile: str,
+    functional_effect: str = "SYNONYMOUS_CODING",
+    codon_changes: List[str] | None = None,
+    workers: int = 4,
+    shards_per_worker: int = 4
+) -> SFSAccumulator:
+    """
+    Function to run sfs_from_tsv() over newline-aligned byte ranges of the
+    file in separate processes. The per-range histograms are merged in file
+    order, so the result equals sfs_from_tsv().
+    Compressed tables cannot be split by byte offset and are read serially.
+    """
+    codon_changes = list(synonymous_1nt_pairs if codon_changes is None else codon_changes)
+    if is_gzipped(inputfile):
+        return sfs_from_tsv(inputfile, functional_effect, codon_changes)
+
+    ranges = split_byte_ranges(inputfile, workers * shards_per_worker)
+    tasks = [(inputfile, start, end, functional_effect, codon_changes) for start, end in ranges]
+
+    accumulator = SFSAccumulator(codon_changes, use_filter=False)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for histograms in executor.map(_count_sfs_range, tasks):
+            accumulator.add_sfs_dict(histograms)
+    return accumulator
+
+
+def extract_snps_tsv_parallel(
+    inputfile: str,
+    functional_effect: str = "SYNONYMOUS_CODING",
+    workers: int = 4,
+    shards_per_worker: int = 4
+) -> List[List[str]]:
+    """
+    Function to extract the rooted records (ROOTED_HEADER) of one effect
+    using separate processes over newline-aligned byte ranges of the file.
+    Records are concatenated in file order, as in process_functional_snps_tsv().
+    Compressed tables cannot be split by byte offset and are read serially.
+    """
+    if is_gzipped(inputfile):
+        sink = ListSink()
+        route_snps_tsv(inputfile, {functional_effect: sink})
+        return sink.records
+
+    ranges = split_byte_ranges(inputfile, workers * shards_per_worker)
+    tasks = [(inputfile, start, end, functional_effect) for start, end in ranges]
+
+    records = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for range_records in executor.map(_extract_range, tasks):
+            records.extend(range_records)
+    return records
@@ -0,0 +1,18 @@
+"""
+Script to convert phyloP/phastCons per-position tables to binary score tracks.
+"""
+
+import sys
+from score_tracks import SCORE_TRACK_SUFFIX, convert_score_table
+
+
+def main():
+    # Convert every table given on the command line next to the original
+    for input_file in sys.argv[1:]:
+        output_file = input_file.rsplit('.', 1)[0] + SCORE_TRACK_SUFFIX
+        convert_score_table(input_file, output_file)
+        print(f"Converted {input_file} to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
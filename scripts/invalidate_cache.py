@@ -0,0 +1,23 @@
+"""
+Script to invalidate the processed chromosome table cache.
+"""
+
+import sys
+from table_cache import ProcessedTableCache
+
+
+def main():
+    # Usage: invalidate_cache.py CACHE_DIR [KEY ...]
+    cache = ProcessedTableCache(sys.argv[1])
+    keys = sys.argv[2:]
+
+    if not keys:
+        cache.invalidate()
+        print(f"Removed every cached table in {sys.argv[1]}")
+    for key in keys:
+        cache.invalidate(key)
+        print(f"Removed cached table {key}")
+
+
+if __name__ == "__main__":
+    main()
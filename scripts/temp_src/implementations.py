@@ -51,7 +51,7 @@ def process_functional_snps_tsv(inputfile: str,
     tsv_lines = []
 
     # Open the input file
-    with open(inputfile, "r", encoding="utf-8") as input_file:
+    with open_tsv(inputfile) as input_file:
         for line in input_file:
             if line.startswith("#"):
                 continue
@@ -107,7 +107,7 @@ def process_nonfunctional_snps_tsv(inputfile: str,
     tsv_lines = []
 
     # Open the input file
-    with open(inputfile, "r", encoding="utf-8") as input_file:
+    with open_tsv(inputfile) as input_file:
         for line in input_file:
             if line.startswith("#"):
                 continue
@@ -3,9 +3,18 @@ Set of functions for processing .TSV file lines.
 """
 
 from typing import Tuple, List
+from compressed_io import open_text
 
 
 # Functions:
+def open_tsv(inputfile: str):
+    """
+    Function to open a plain or gzip/BGZF compressed .TSV file for reading
+    (see compressed_io.open_text()).
+    """
+    return open_text(inputfile)
+
+
 def process_snp_signature(line: List[str]) -> List[str]:
     """
     Function to process a line of the .TSV file.
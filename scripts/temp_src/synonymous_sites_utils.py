@@ -3,78 +3,11 @@ Script to prepare synonymous SFSS to analyze with PRF-ratios.
 """
 
 from typing import List
+from genetic_code import synonymous_1nt_pairs
 
 
 # Define the numerical keys for the synonymous pairs
-rooted_synonymous_pairs_dict = {
-    1: "TTT->TTC", 2: "TTC->TTT",
-    3: "CTT->CTC", 4: "CTC->CTT",
-    5: "CTT->CTA", 6: "CTA->CTT",
-    7: "CTT->CTG", 8: "CTG->CTT",
-    9: "CTA->CTC", 10: "CTC->CTA",
-    11: "CTA->CTG", 12: "CTG->CTA",
-    13: "CTC->CTG", 14: "CTG->CTC",
-    15: "CTG->TTG", 16: "TTG->CTG",
-    17: "CTA->TTA", 18: "TTA->CTA",
-    19: "TTA->TTG", 20: "TTG->TTA",
-    21: "ATT->ATC", 22: "ATC->ATT",
-    23: "ATT->ATA", 24: "ATA->ATT",
-    25: "ATA->ATC", 26: "ATC->ATA",
-    27: "GTT->GTC", 28: "GTC->GTT",
-    29: "GTT->GTA", 30: "GTA->GTT",
-    31: "GTT->GTG", 32: "GTG->GTT",
-    33: "GTC->GTA", 34: "GTA->GTC",
-    35: "GTC->GTG", 36: "GTG->GTC",
-    37: "GTA->GTG", 38: "GTG->GTA",
-    39: "TCT->TCC", 40: "TCC->TCT",
-    41: "TCT->TCA", 42: "TCA->TCT",
-    43: "TCT->TCG", 44: "TCG->TCT",
-    45: "TCC->TCA", 46: "TCA->TCC",
-    47: "TCC->TCG", 48: "TCG->TCC",
-    49: "TCA->TCG", 50: "TCG->TCA",
-    51: "AGT->AGC", 52: "AGC->AGT",
-    53: "CCT->CCC", 54: "CCC->CCT",
-    55: "CCT->CCA", 56: "CCA->CCT",
-    57: "CCT->CCG", 58: "CCG->CCT",
-    59: "CCC->CCA", 60: "CCA->CCC",
-    61: "CCC->CCG", 62: "CCG->CCC",
-    63: "CCA->CCG", 64: "CCG->CCA",
-    65: "ACT->ACC", 66: "ACC->ACT",
-    67: "ACT->ACA", 68: "ACA->ACT",
-    69: "ACT->ACG", 70: "ACG->ACT",
-    71: "ACC->ACA", 72: "ACA->ACC",
-    73: "ACC->ACG", 74: "ACG->ACC",
-    75: "ACA->ACG", 76: "ACG->ACA",
-    77: "GCT->GCC", 78: "GCC->GCT",
-    79: "GCT->GCA", 80: "GCA->GCT",
-    81: "GCT->GCG", 82: "GCG->GCT",
-    83: "GCC->GCA", 84: "GCA->GCC",
-    85: "GCC->GCG", 86: "GCG->GCC",
-    87: "GCA->GCG", 88: "GCG->GCA",
-    89: "TAT->TAC", 90: "TAC->TAT",
-    91: "CAT->CAC", 92: "CAC->CAT",
-    93: "CAA->CAG", 94: "CAG->CAA",
-    95: "AAT->AAC", 96: "AAC->AAT",
-    97: "AAA->AAG", 98: "AAG->AAA",
-    99: "GAT->GAC", 100: "GAC->GAT",
-    101: "GAA->GAG", 102: "GAG->GAA",
-    103: "TGT->TGC", 104: "TGC->TGT",
-    105: "CGT->CGC", 106: "CGC->CGT",
-    107: "CGT->CGA", 108: "CGA->CGT",
-    109: "CGT->CGG", 110: "CGG->CGT",
-    111: "CGC->CGA", 112: "CGA->CGC",
-    113: "CGC->CGG", 114: "CGG->CGC",
-    115: "CGA->CGG", 116: "CGG->CGA",
-    117: "CGA->AGA", 118: "AGA->CGA",
-    119: "AGA->AGG", 120: "AGG->AGA",
-    121: "CGG->AGG", 122: "AGG->CGG",
-    123: "GGT->GGC", 124: "GGC->GGT",
-    125: "GGT->GGA", 126: "GGA->GGT",
-    127: "GGT->GGG", 128: "GGG->GGT",
-    129: "GGC->GGA", 130: "GGA->GGC",
-    131: "GGC->GGG", 132: "GGG->GGC",
-    133: "GGA->GGG", 134: "GGG->GGA",
-}
+rooted_synonymous_pairs_dict = dict(enumerate(synonymous_1nt_pairs, start=1))
 
 # Convert the numerical keys to string keys
 rooted_synonymous_pairs_dict = {value: {} for value in rooted_synonymous_pairs_dict.values()}
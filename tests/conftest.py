@@ -0,0 +1,103 @@
+"""
+Shared fixtures: the analysis modules are imported flat from PRF_Ratios_syn.
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'PRF_Ratios_syn'))
+
+SWAP_PAIRS = [
+    ('ref', 'alt'),
+    ('refcount', 'altcount'),
+    ('refcontext', 'altcontext'),
+    ('refcontext_complrev', 'altcontext_complrev'),
+    ('refcodon', 'altcodon'),
+    ('refaa', 'altaa')
+]
+
+
+def make_main_table(n: int = 500, seed: int = 0) -> pd.DataFrame:
+    """
+    Function to make a small synthetic main table (one row per SNP).
+    """
+    from genetic_code import CODONS
+
+    rng = np.random.default_rng(seed)
+    total = rng.integers(5, 40, n)
+    alt = rng.integers(1, total)
+    refcodon = rng.choice(CODONS, n).astype(object)
+    # Mostly single-nucleotide changes, some missing codons
+    altcodon = np.array([codon[:2] + 'TCAG'[rng.integers(0, 4)] for codon in refcodon], dtype=object)
+    refcodon[rng.random(n) < 0.05] = np.nan
+    return pd.DataFrame({
+        'chrom': 'chr2L',
+        'pos': np.sort(rng.choice(np.arange(1, 100 * n), n, replace=False)),
+        'aainfo': rng.choice(['root_ref', 'root_alt', 'NA'], n),
+        'ref': rng.choice(list('ACGT'), n),
+        'alt': rng.choice(list('ACGT'), n),
+        'refaa': 'F',
+        'altaa': 'L',
+        'refcount': total - alt,
+        'altcount': alt,
+        'totalcount': total,
+        'refcontext': 'AACGT',
+        'altcontext': 'AATGT',
+        'refcontext_complrev': 'ACGTT',
+        'altcontext_complrev': 'ACATT',
+        'refcodon': [codon.lower() if isinstance(codon, str) else codon for codon in refcodon],
+        'altcodon': altcodon,
+        'maineffect': 'SYNONYMOUS_CODING',
+        'custom_annotation': rng.choice(['eij', 'cds', 'NA'], n)
+    })
+
+
+def write_chromosome_files(directory: str, chrom: str = 'chr2L', n: int = 500, seed: int = 0) -> tuple:
+    """
+    Function to write the four input files of a chromosome (main table,
+    custom annotation table, phyloP and phastCons tables) and return their paths.
+    """
+    rng = np.random.default_rng(seed + 1)
+    main_df = make_main_table(n, seed)
+    main_df['chrom'] = chrom
+    main_df['maineffect'] = rng.choice(['SYNONYMOUS_CODING', 'NON_SYNONYMOUS_CODING', 'INTERGENIC'], n)
+    main_path = os.path.join(directory, f'{chrom}_tables.tsv')
+    main_df.drop(columns='custom_annotation').to_csv(main_path, sep='\t', index=False, na_rep='NA')
+
+    extra_df = main_df[['chrom', 'pos', 'custom_annotation']].rename(columns={'pos': 'position'})
+    extra_path = os.path.join(directory, f'{chrom}_extra_ann.tsv')
+    extra_df.to_csv(extra_path, sep='\t', index=False, na_rep='NA')
+
+    score_paths = []
+    for name in ('phylop', 'phastcons'):
+        # Scores for most positions, so some SNPs get 'NA'
+        positions = np.sort(rng.choice(np.arange(1, main_df['pos'].max() + 1), int(main_df['pos'].max() * 0.9),
+                                       replace=False))
+        scores = pd.DataFrame({'chromosome': chrom, 'position': positions, 'start': 1, 'step': 1, 'span': 1,
+                               'score': np.round(rng.normal(size=len(positions)), 3)})
+        score_path = os.path.join(directory, f'{name}_{chrom}.csv')
+        scores.to_csv(score_path, index=False)
+        score_paths.append(score_path)
+
+    return (main_path, extra_path, *score_paths)
+
+
+@pytest.fixture
+def main_table() -> pd.DataFrame:
+    return make_main_table()
+
+
+@pytest.fixture
+def swap_pairs():
+    return SWAP_PAIRS
+
+
+@pytest.fixture
+def chromosome_files(tmp_path):
+    """
+    Factory writing the input files of a chromosome to tmp_path.
+    """
+    return lambda chrom='chr2L', n=500, seed=0: write_chromosome_files(str(tmp_path), chrom, n, seed)
@@ -0,0 +1,56 @@
+"""
+Tests for codon_analyses.
+"""
+
+import pytest
+from codon_analyses import count_codon_change_sfs, create_codon_change_sfs_dict, sfs_counting_benchmark_report
+from data_processing import process_main_table
+from genetic_code import get_genetic_code, synonymous_1nt_pairs
+
+
+@pytest.mark.parametrize('use_filter', [True, False])
+def test_vectorized_sfs_matches_iterrows(main_table, swap_pairs, use_filter):
+    df = process_main_table(main_table, swap_pairs)
+    vectorized = create_codon_change_sfs_dict(df, use_filter, vectorized=True)
+    row_wise = create_codon_change_sfs_dict(df, use_filter, vectorized=False)
+
+    assert vectorized == row_wise
+    # Same key order, codon changes and total counts
+    assert list(vectorized) == list(row_wise)
+    for change in row_wise:
+        assert list(vectorized[change]) == list(row_wise[change])
+    assert any(vectorized.values())
+
+
+def test_derived_count_outside_total_count_raises():
+    change = synonymous_1nt_pairs[0]
+    with pytest.raises(ValueError):
+        count_codon_change_sfs([change, change], [10, 10], [3, 11], synonymous_1nt_pairs)
+    with pytest.raises(ValueError):
+        count_codon_change_sfs([change], [10], [-1], synonymous_1nt_pairs)
+
+
+def test_sfs_counting_benchmark_report(main_table, swap_pairs):
+    report = sfs_counting_benchmark_report(process_main_table(main_table, swap_pairs))
+    assert report['mode'].tolist() == ['iterrows', 'vectorized']
+    assert report['identical'].all()
+
+
+def test_sfs_from_codes_matches_strings(main_table, swap_pairs):
+    df = process_main_table(main_table, swap_pairs)
+    from_codes = create_codon_change_sfs_dict(df, use_filter=True)
+    from_strings = create_codon_change_sfs_dict(df.drop(columns='codon_change_code'), use_filter=True)
+    assert from_codes == from_strings
+    assert list(from_codes) == list(from_strings)
+
+
+@pytest.mark.parametrize('vectorized', [True, False])
+def test_sfs_dict_follows_the_genetic_code(main_table, swap_pairs, vectorized):
+    df = process_main_table(main_table, swap_pairs)
+    code = get_genetic_code(5)
+    result = create_codon_change_sfs_dict(df, use_filter=True, vectorized=vectorized, code=code)
+    assert list(result) == code.synonymous_1nt_pairs
+    assert result == count_codon_change_sfs(df.loc[df['custom_annotation'] != 'eij', 'codon_change'],
+                                            df.loc[df['custom_annotation'] != 'eij', 'totalcount'],
+                                            df.loc[df['custom_annotation'] != 'eij', 'altcount'],
+                                            code.synonymous_1nt_pairs)
@@ -0,0 +1,22 @@
+"""
+Tests for codon_encoding.
+"""
+
+import numpy as np
+from codon_encoding import CODON_CHANGE_NA, codon_change_positions, encode_codon_changes, first_positions
+
+
+def test_repeated_codon_changes_map_to_first_position():
+    codon_changes = ['TTT->TTC', 'GGA->GGG', 'TTT->TTC', 'NA', 'GGA->GGG', 'CTT->CTC', 'TTT->TTC'] * 50
+    positions = codon_change_positions(codon_changes)
+    codes = encode_codon_changes(codon_changes)
+
+    for change in set(codon_changes) - {'NA'}:
+        assert positions[encode_codon_changes([change])[0]] == codon_changes.index(change)
+    assert positions[CODON_CHANGE_NA] == -1
+    assert np.count_nonzero(positions >= 0) == 3
+    np.testing.assert_array_equal(first_positions(codes), positions)
+
+
+def test_empty_codon_changes():
+    assert (codon_change_positions([]) == -1).all()
@@ -0,0 +1,113 @@
+"""
+Tests for compressed_io.
+"""
+
+import gzip
+import os
+import numpy as np
+import pytest
+from compressed_io import (BGZF_INDEX_SUFFIX, BGZFIndex, BGZFReader, build_bgzf_index, fetch_region,
+                           is_bgzf, is_gzipped, open_text, write_bgzf)
+
+
+def make_table_lines(seed: int = 0) -> list:
+    """
+    Function to make sorted (chromosome, position) table lines spanning
+    several BGZF blocks, with repeated positions and a header.
+    """
+    rng = np.random.default_rng(seed)
+    lines = ['#chrom\tpos\tvalue\n']
+    for chrom in ('chr2L', 'chr2R', 'chr3L'):
+        positions = np.sort(rng.integers(1, 20000, 3000))
+        for pos in positions:
+            lines.append(f'{chrom}\t{pos}\t{"x" * int(rng.integers(1, 40))}\n')
+    return lines
+
+
+@pytest.fixture
+def table(tmp_path):
+    lines = make_table_lines()
+    plain = tmp_path / 'table.tsv'
+    plain.write_text(''.join(lines))
+    bgzf = tmp_path / 'table.tsv.bgz'
+    write_bgzf(str(plain), str(bgzf))
+    return lines, str(plain), str(bgzf)
+
+
+def test_bgzf_round_trip(table):
+    lines, plain, bgzf = table
+    assert os.path.getsize(plain) > 3 * 65280
+    with open_text(bgzf) as f:
+        assert f.readlines() == lines
+    with gzip.open(bgzf, 'rt') as f:
+        assert f.read() == ''.join(lines)
+
+    # Re-reading from every virtual offset starts at its line
+    with BGZFReader(bgzf) as reader:
+        records = list(reader.iter_lines())
+        assert [line.decode('utf-8') for _, line in records] == lines
+        for virtual_offset, line in records[::250] + records[-3:]:
+            assert next(reader.iter_lines(virtual_offset))[1] == line
+
+
+def test_bgzf_is_told_from_plain_gzip(table, tmp_path):
+    lines, plain, bgzf = table
+    gzipped = tmp_path / 'table.tsv.gz'
+    with gzip.open(gzipped, 'wt') as f:
+        f.write(''.join(lines))
+
+    assert is_gzipped(bgzf) and is_bgzf(bgzf)
+    assert is_gzipped(str(gzipped)) and not is_bgzf(str(gzipped))
+    assert not is_gzipped(plain) and not is_bgzf(plain)
+
+    # A gzipped input is re-blocked by write_bgzf
+    reblocked = tmp_path / 'reblocked.tsv.bgz'
+    write_bgzf(str(gzipped), str(reblocked))
+    assert is_bgzf(str(reblocked))
+    with open_text(str(reblocked)) as f:
+        assert f.readlines() == lines
+
+
+def test_bgzf_reader_rejects_plain_text(table):
+    _, plain, _ = table
+    with BGZFReader(plain) as reader:
+        with pytest.raises(ValueError):
+            next(reader.iter_lines())
+
+
+@pytest.mark.parametrize('chrom, start, end', [
+    ('chr2L', 1, 20000),
+    ('chr2R', 5000, 5200),
+    ('chr2R', 7777, 7777),
+    ('chr3L', 19000, 30000),
+    ('chr3L', 0, 50),
+    ('chr2L', 30000, 40000),
+    ('chrX', 1, 20000)
+])
+def test_fetch_region_matches_linear_scan(table, chrom, start, end):
+    lines, _, bgzf = table
+    index = build_bgzf_index(bgzf)
+
+    expected = []
+    for line in lines[1:]:
+        fields = line.split('\t')
+        if fields[0] == chrom and start <= int(fields[1]) <= end:
+            expected.append(line)
+
+    assert list(fetch_region(bgzf, chrom, start, end, index=index)) == expected
+    # The index saved next to the table gives the same lines
+    assert list(fetch_region(bgzf, chrom, start, end)) == expected
+
+
+def test_bgzf_index_save_load(table, tmp_path):
+    _, _, bgzf = table
+    index = build_bgzf_index(bgzf, output_file=str(tmp_path / 'index.npz'))
+    assert not os.path.exists(bgzf + BGZF_INDEX_SUFFIX)
+
+    loaded = BGZFIndex.load(str(tmp_path / 'index.npz'))
+    assert list(loaded.chromosomes) == ['chr2L', 'chr2R', 'chr3L']
+    for chrom, (positions, offsets) in index.chromosomes.items():
+        np.testing.assert_array_equal(loaded.chromosomes[chrom][0], positions)
+        np.testing.assert_array_equal(loaded.chromosomes[chrom][1], offsets)
+        # One entry per block holding lines of the chromosome, at most
+        assert len(np.unique(offsets >> np.uint64(16))) == len(offsets)
@@ -0,0 +1,88 @@
+"""
+Tests for data_processing.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from codon_encoding import CODON_CHANGE_NA, decode_codon_changes
+from data_processing import (process_all_chromosomes, process_chromosome, process_chromosome_chunks,
+                             process_main_table, processing_benchmark_report, read_main_table)
+from table_cache import ProcessedTableCache
+
+
+def test_columnar_processing_matches_apply(main_table, swap_pairs):
+    columnar = process_main_table(main_table, swap_pairs, columnar=True)
+    row_wise = process_main_table(main_table, swap_pairs, columnar=False)
+    pd.testing.assert_frame_equal(columnar, row_wise)
+
+
+def test_columnar_processing_leaves_input_untouched(main_table, swap_pairs):
+    original = main_table.copy()
+    process_main_table(main_table, swap_pairs, columnar=True)
+    pd.testing.assert_frame_equal(main_table, original)
+
+
+def test_processing_benchmark_report(main_table, swap_pairs):
+    report = processing_benchmark_report(main_table, swap_pairs)
+    assert report['mode'].tolist() == ['apply', 'columnar']
+    assert report['identical'].all()
+
+
+def test_codon_change_code_column_matches_strings(main_table, swap_pairs):
+    main_table.loc[main_table.index[:3], ['refcodon', 'altcodon']] = ['ttc', 'TNC']
+    df = process_main_table(main_table, swap_pairs)
+    assert df['codon_change_code'].dtype == np.uint16
+
+    codes = df['codon_change_code'].to_numpy()
+    encoded = codes != CODON_CHANGE_NA
+    assert (decode_codon_changes(codes[encoded]) == df['codon_change'].to_numpy()[encoded]).all()
+    # Missing and unencodable codons keep their string, without a code
+    unencoded = df.loc[~encoded, 'codon_change']
+    assert unencoded.str.contains('TNC').sum() == 3
+    assert (unencoded.str.contains('TNC') | (unencoded == 'NA')).all()
+
+
+@pytest.fixture
+def schema_table(tmp_path, main_table):
+    path = tmp_path / 'chr2L_tables.tsv'
+    main_table.to_csv(path, sep='\t', index=False, na_rep='NA')
+    return read_main_table(str(path))
+
+
+def test_columnar_processing_matches_apply_on_schema_dtypes(schema_table, swap_pairs):
+    columnar = process_main_table(schema_table, swap_pairs, columnar=True)
+    row_wise = process_main_table(schema_table, swap_pairs, columnar=False)
+    pd.testing.assert_frame_equal(columnar, row_wise, check_dtype=False, check_categorical=False)
+    assert isinstance(columnar['refcodon'].dtype, pd.CategoricalDtype)
+
+
+def test_processing_benchmark_report_on_schema_dtypes(schema_table, swap_pairs):
+    report = processing_benchmark_report(schema_table, swap_pairs)
+    assert report['identical'].all()
+
+
+@pytest.mark.parametrize('maineffect', [None, 'SYNONYMOUS_CODING'])
+def test_chunked_processing_matches_in_memory(chromosome_files, swap_pairs, maineffect):
+    files = chromosome_files(n=700)
+    in_memory = process_chromosome(*files, swap_pairs, maineffect=maineffect)
+    chunked = process_chromosome(*files, swap_pairs, chunksize=64, maineffect=maineffect)
+
+    assert len(list(process_chromosome_chunks(*files, swap_pairs, chunksize=64))) == 11
+    pd.testing.assert_frame_equal(chunked, in_memory)
+    assert (in_memory['phyloP'] == 'NA').any()
+
+
+def test_parallel_chromosomes_match_serial(chromosome_files, swap_pairs, tmp_path):
+    files = [chromosome_files(chrom, n=200 + 50 * i, seed=i) for i, chrom in enumerate(['chr2L', 'chr2R', 'chr3L'])]
+    serial = process_all_chromosomes(files, swap_pairs, workers=1)
+    parallel = process_all_chromosomes(files, swap_pairs, workers=2)
+
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert serial['chrom'].unique().tolist() == ['chr2L', 'chr2R', 'chr3L']
+
+    # Workers fill the cache, and cached tables give the same result
+    cache = ProcessedTableCache(str(tmp_path / 'cache'))
+    pd.testing.assert_frame_equal(process_all_chromosomes(files, swap_pairs, workers=2, cache=cache), serial)
+    assert len(cache.entries()) == 3
+    pd.testing.assert_frame_equal(process_all_chromosomes(files, swap_pairs, workers=2, cache=cache), serial)
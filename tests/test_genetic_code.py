@@ -0,0 +1,24 @@
+"""
+Tests for genetic_code.
+"""
+
+from genetic_code import LEGACY_1NT_ORDER, STANDARD_CODE, get_genetic_code, synonymous_1nt_pairs, synonymous_pairs
+
+
+def test_synonymous_1nt_pairs_keep_legacy_order():
+    # LEGACY_1NT_ORDER is the pinned copy of the hand-written list: every change followed by its reverse
+    legacy = [pair for change in LEGACY_1NT_ORDER for pair in (change, '->'.join(change.split('->')[::-1]))]
+    assert len(synonymous_1nt_pairs) == len(legacy) == 134
+    assert synonymous_1nt_pairs == legacy
+
+
+def test_synonymous_1nt_pairs_match_the_matrix():
+    assert set(synonymous_1nt_pairs) == STANDARD_CODE.synonymous_1nt_pairs_set
+    assert set(synonymous_1nt_pairs) <= set(synonymous_pairs)
+    assert len(synonymous_pairs) == 180
+
+
+def test_other_codes_list_every_single_nucleotide_change():
+    code = get_genetic_code(5)
+    assert len(code.synonymous_1nt_pairs) == int(code.synonymous_1nt.sum())
+    assert set(code.synonymous_1nt_pairs) == code.synonymous_1nt_pairs_set
@@ -0,0 +1,169 @@
+"""
+Tests for score_tracks.
+"""
+
+import gzip
+import json
+import struct
+import numpy as np
+import pandas as pd
+import pytest
+from data_processing import merge_tables
+from score_tracks import (SCORE_TRACK_ALIGNMENT, SCORE_TRACK_MAGIC, ScoreTrack, load_score_track, read_score_table,
+                          read_score_track, read_wiggle, save_score_track)
+
+
+def test_lookup_matches_chromosome_names_exactly():
+    track = ScoreTrack('phyloP')
+    track.add_chromosome('chr2L', [10, 11, 12], [0.5, 1.5, 2.5])
+
+    assert np.isnan(track.lookup(['2L'], [11])).all()
+    np.testing.assert_array_equal(track.lookup(['chr2L', 'chr2L'], [11, 13]), [1.5, np.nan])
+    np.testing.assert_array_equal(track.lookup(['2L'], [11], match_chr_prefix=True), [1.5])
+
+
+def test_track_lookup_matches_position_merge():
+    main_df = pd.DataFrame({'chrom': ['chr2L', 'chr2L', '2L', 'chr2R'], 'pos': [10, 12, 10, 10]})
+    extra_df = pd.DataFrame({'chrom': ['chr2L'], 'position': [10], 'custom_annotation': ['cds']})
+    scores = pd.DataFrame({'chromosome': ['chr2L', 'chr2L'], 'position': [10, 11], 'score': [0.5, 1.5]})
+
+    # Exact (chrom, pos) merge the track lookup replaces
+    expected = pd.merge(main_df, scores, left_on=['chrom', 'pos'],
+                        right_on=['chromosome', 'position'], how='left')['score']
+
+    merged = merge_tables(main_df, extra_df, ScoreTrack.from_dataframe(scores, 'phyloP'), scores)
+    assert merged['phyloP'].tolist() == expected.fillna('NA').tolist() == [0.5, 'NA', 'NA', 'NA']
+    assert merged['phastCons'].tolist() == merged['phyloP'].tolist()
+
+
+def test_float32_scores_are_not_widened(tmp_path):
+    path = tmp_path / 'phylop_chr2L.csv'
+    path.write_text('chromosome,position,start,step,span,score\n'
+                    'chr2L,10,1,1,1,-0.665\nchr2L,11,1,1,1,1.25\n')
+    track = ScoreTrack.from_dataframe(read_score_table(str(path)), 'phyloP')
+
+    scores = track.lookup(['chr2L', 'chr2L', 'chr2L'], [10, 11, 12])
+    assert scores.dtype == np.float32
+    assert str(scores[0]) == '-0.665'
+
+    main_df = pd.DataFrame({'chrom': ['chr2L', 'chr2L'], 'pos': [10, 11]})
+    extra_df = pd.DataFrame({'chrom': ['chr2L'], 'position': [10], 'custom_annotation': ['cds']})
+    merged = merge_tables(main_df, extra_df, track, track)
+    assert merged['phyloP'].dtype == np.float32
+    assert merged['phyloP'].astype(str).tolist() == ['-0.665', '1.25']
+
+
+def make_gapped_track() -> ScoreTrack:
+    """
+    Function to make a two-chromosome track with gaps, one of them
+    stored as non-NaN scores hidden by the coverage mask.
+    """
+    track = ScoreTrack('phyloP')
+    track.add_chromosome('chr2L', [5, 6, 7, 20, 21, 100], [0.5, -1.25, 2.0, 3.5, -0.665, 7.0])
+    scores = np.arange(50, dtype=np.float32) / 4
+    covered = np.ones(50, dtype=bool)
+    covered[[0, 13, 14, 15, 49]] = False
+    track.set_chromosome('chr3R', 1000, scores, np.packbits(covered))
+    return track
+
+
+@pytest.mark.parametrize('mmap', [True, False])
+def test_score_track_round_trip(tmp_path, mmap):
+    track = make_gapped_track()
+    path = str(tmp_path / 'phylop.track')
+    save_score_track(track, path)
+    loaded = load_score_track(path, mmap=mmap)
+
+    assert loaded.name == 'phyloP'
+    assert list(loaded.chromosomes) == ['chr2L', 'chr3R']
+    for chrom, (offset, scores) in loaded.chromosomes.items():
+        assert offset == track.chromosomes[chrom][0]
+        assert isinstance(scores, np.memmap) == mmap
+        assert isinstance(loaded.masks[chrom], np.memmap) == mmap
+        np.testing.assert_array_equal(loaded.coverage(chrom), track.coverage(chrom))
+
+    chroms = ['chr2L'] * 102 + ['chr3R'] * 52
+    positions = list(range(102)) + list(range(999, 1051))
+    np.testing.assert_array_equal(loaded.lookup(chroms, positions), track.lookup(chroms, positions))
+
+    # Gaps and masked positions come back as NaN
+    assert np.isnan(loaded.lookup(['chr2L', 'chr2L', 'chr3R', 'chr3R', 'chr3R'], [8, 99, 1000, 1014, 1049])).all()
+    np.testing.assert_array_equal(loaded.lookup(['chr2L', 'chr3R'], [21, 1012]), np.float32([-0.665, 3.0]))
+
+
+def test_score_track_layout_is_aligned(tmp_path):
+    path = str(tmp_path / 'phylop.track')
+    save_score_track(make_gapped_track(), path)
+    with open(path, 'rb') as f:
+        assert f.read(len(SCORE_TRACK_MAGIC)) == SCORE_TRACK_MAGIC
+        (header_size,) = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_size))
+
+    for entry in header['chromosomes']:
+        assert entry['data_start'] % SCORE_TRACK_ALIGNMENT == 0
+        assert entry['mask_start'] % SCORE_TRACK_ALIGNMENT == 0
+    assert read_score_track(path).lookup(['chr2L'], [6])[0] == np.float32(-1.25)
+
+
+def test_load_score_track_rejects_other_files(tmp_path):
+    path = tmp_path / 'phylop.track'
+    path.write_bytes(b'chromosome,position,score\n')
+    with pytest.raises(ValueError):
+        load_score_track(str(path))
+
+
+WIGGLE = ('browser position chr2L:1-200\n'
+          'track type=wiggle_0 name="phyloP"\n'
+          '# comment\n'
+          'fixedStep chrom=chr2L start=10 step=5 span=2\n'
+          '0.5\n-1.25\n2\n'
+          '\n'
+          'variableStep chrom=chr2L span=3\n'
+          '100 1.5\n110 -0.665\n'
+          'fixedStep chrom=chr3R start=7\n'
+          '4\n5\n')
+
+# Expected (chrom, position) -> score; every other position has no score
+WIGGLE_SCORES = {('chr2L', 10): 0.5, ('chr2L', 11): 0.5, ('chr2L', 15): -1.25, ('chr2L', 16): -1.25,
+                 ('chr2L', 20): 2.0, ('chr2L', 21): 2.0, ('chr2L', 100): 1.5, ('chr2L', 101): 1.5,
+                 ('chr2L', 102): 1.5, ('chr2L', 110): -0.665, ('chr2L', 111): -0.665,
+                 ('chr2L', 112): -0.665, ('chr3R', 7): 4.0, ('chr3R', 8): 5.0}
+
+
+def assert_wiggle_scores(track: ScoreTrack) -> None:
+    chroms = ['chr2L'] * 120 + ['chr3R'] * 12
+    positions = list(range(120)) + list(range(12))
+    expected = [WIGGLE_SCORES.get(key, np.nan) for key in zip(chroms, positions)]
+    np.testing.assert_array_equal(track.lookup(chroms, positions), np.float32(expected))
+
+
+@pytest.mark.parametrize('suffix', ['.wig', '.wig.gz'])
+def test_read_wiggle(tmp_path, suffix):
+    path = tmp_path / f'phylop{suffix}'
+    if suffix.endswith('.gz'):
+        with gzip.open(path, 'wt') as f:
+            f.write(WIGGLE)
+    else:
+        path.write_text(WIGGLE)
+
+    track = read_wiggle(str(path), name='phyloP')
+    assert track.name == 'phyloP'
+    assert list(track.chromosomes) == ['chr2L', 'chr3R']
+    assert track.dtype == np.float32
+    assert_wiggle_scores(track)
+
+
+def test_read_score_track_dispatches_on_suffix(tmp_path):
+    wiggle = tmp_path / 'phylop.wigFix'
+    wiggle.write_text(WIGGLE)
+
+    table = tmp_path / 'phylop.csv'
+    rows = [f'{chrom},{pos},1,1,1,{score}' for (chrom, pos), score in WIGGLE_SCORES.items()]
+    table.write_text('chromosome,position,start,step,span,score\n' + '\n'.join(rows) + '\n')
+
+    binary = str(tmp_path / 'phylop.track')
+    save_score_track(read_wiggle(str(wiggle)), binary)
+
+    for path in (str(wiggle), str(table), binary):
+        assert_wiggle_scores(read_score_track(path, name='phyloP'))
+    assert isinstance(read_score_track(binary).chromosomes['chr2L'][1], np.memmap)
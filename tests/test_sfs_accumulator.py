@@ -0,0 +1,69 @@
+"""
+Tests for sfs_accumulator.
+"""
+
+from itertools import permutations
+import numpy as np
+import pandas as pd
+import pytest
+from codon_analyses import create_codon_change_sfs_dict
+from data_processing import process_main_table
+from genetic_code import get_genetic_code
+from sfs_accumulator import SFSAccumulator
+
+
+@pytest.fixture
+def regions(main_table, swap_pairs) -> list:
+    df = process_main_table(main_table, swap_pairs)
+    bounds = np.quantile(df['pos'], [0.3, 0.7])
+    return [df[df['pos'] < bounds[0]], df[(df['pos'] >= bounds[0]) & (df['pos'] < bounds[1])],
+            df[df['pos'] >= bounds[1]]]
+
+
+def test_merging_regions_in_any_order_matches_one_pass(regions):
+    whole = SFSAccumulator().ingest(pd.concat(regions)).to_dict()
+    per_region = [SFSAccumulator().ingest(region) for region in regions]
+
+    for order in permutations(per_region):
+        merged = SFSAccumulator()
+        for accumulator in order:
+            merged.merge(accumulator)
+        assert merged.to_dict() == whole
+        assert list(merged.to_dict()) == list(whole)
+
+    assert (per_region[2] + per_region[0] + per_region[1]).to_dict() == whole
+    assert (per_region[0] + (per_region[1] + per_region[2])).to_dict() == whole
+
+
+def test_accumulator_matches_codon_change_sfs_dict(regions):
+    expected = create_codon_change_sfs_dict(pd.concat(regions), use_filter=True)
+    result = SFSAccumulator().ingest_all(regions).to_dict()
+    assert result == {change: dict(sorted(size_data.items())) for change, size_data in expected.items()}
+    for change in result:
+        assert list(result[change]) == sorted(expected[change])
+
+
+def test_accumulator_follows_the_genetic_code(regions):
+    code = get_genetic_code(5)
+    accumulator = SFSAccumulator(code=code).ingest_all(regions)
+    assert accumulator.codon_changes == code.synonymous_1nt_pairs
+    expected = create_codon_change_sfs_dict(pd.concat(regions), use_filter=True, code=code)
+    assert accumulator.to_dict() == {change: dict(sorted(size_data.items())) for change, size_data in expected.items()}
+
+
+def test_add_leaves_operands_untouched(regions):
+    first, second = SFSAccumulator().ingest(regions[0]), SFSAccumulator().ingest(regions[1])
+    before = first.to_dict(), second.to_dict()
+    first + second
+    assert (first.to_dict(), second.to_dict()) == before
+
+
+def test_save_load_and_resume(regions, tmp_path):
+    path = str(tmp_path / 'accumulator.npz')
+    SFSAccumulator().ingest_all(regions[:2]).save(path)
+
+    loaded = SFSAccumulator.load(path)
+    assert loaded.to_dict() == SFSAccumulator().ingest_all(regions[:2]).to_dict()
+
+    # A resumed accumulator keeps counting
+    assert loaded.ingest(regions[2]).to_dict() == SFSAccumulator().ingest_all(regions).to_dict()
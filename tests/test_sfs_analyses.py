@@ -0,0 +1,140 @@
+"""
+Tests for sfs_analyses.
+"""
+
+import json
+import numpy as np
+import pytest
+from sfs_analyses import ProjectionCache, downsample_codon_change_sfs_in_dict, downsample_sfs, save_data
+
+
+@pytest.mark.parametrize('use_store', [False, True])
+def test_cached_projection_matrices_are_read_only(tmp_path, use_store):
+    cache = ProjectionCache(store_dir=str(tmp_path) if use_store else None)
+    first = cache.get(20, 10)
+    cache.clear()
+    second = cache.get(20, 10)
+
+    for matrix in (first, second):
+        assert not matrix.flags.writeable
+        with pytest.raises(ValueError):
+            matrix[0, 0] = 1.0
+    np.testing.assert_array_equal(first, second)
+
+
+def make_sfs_dict(seed: int = 0) -> dict:
+    """
+    Function to make a small SFS dictionary with original sample sizes
+    above, between and below the target sizes of the cascade tests.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = [25, 22, 20, 18, 14, 12, 9, 7, 5]
+    sfs_dict = {}
+    for change in ['TTT->TTC', 'TTC->TTT', 'CTT->CTC', 'GGA->GGG']:
+        chosen = rng.choice(sizes, rng.integers(3, len(sizes)), replace=False)
+        sfs_dict[change] = {int(n): rng.integers(0, 50, n + 1).tolist() for n in chosen}
+    return sfs_dict
+
+
+@pytest.mark.parametrize('target_sample_sizes', [[20, 12, 6], [6, 12, 20], [12]])
+def test_cascade_projection_matches_direct(target_sample_sizes):
+    sfs_dict = make_sfs_dict()
+    cascade = downsample_codon_change_sfs_in_dict(sfs_dict, target_sample_sizes, batched=True, cascade=True)
+    direct = downsample_codon_change_sfs_in_dict(sfs_dict, target_sample_sizes, batched=True, cascade=False)
+    one_by_one = downsample_codon_change_sfs_in_dict(sfs_dict, target_sample_sizes, batched=False)
+
+    assert list(cascade) == list(direct) == list(one_by_one)
+    for change in sfs_dict:
+        for m in target_sample_sizes:
+            assert len(cascade[change][m]) == m + 1
+            np.testing.assert_allclose(cascade[change][m], direct[change][m], rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(cascade[change][m], one_by_one[change][m], rtol=1e-12, atol=1e-12)
+
+
+def test_cascade_projection_preserves_counts():
+    sfs_dict = make_sfs_dict(1)
+    projected = downsample_codon_change_sfs_in_dict(sfs_dict, [20, 12, 6], cascade=True)
+    for change, size_data in sfs_dict.items():
+        for m in (20, 12, 6):
+            expected = sum(sum(sfs) for n, sfs in size_data.items() if n >= m)
+            assert sum(projected[change][m]) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('banded', [False, True])
+def test_float32_downsampling_returns_plain_floats(banded):
+    sfs = downsample_sfs([0, 3, 5, 0, 2, 1, 0], 6, 4, dtype=np.float32, banded=banded)
+    assert all(type(value) is float for value in sfs)
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_float32_results_save_as_json(tmp_path, batched):
+    projected = downsample_codon_change_sfs_in_dict(make_sfs_dict(), [20, 12], batched=batched, dtype=np.float32)
+    save_data(projected, str(tmp_path / 'x.pkl'), str(tmp_path / 'x.json'))
+    with open(tmp_path / 'x.json') as f:
+        saved = json.load(f)
+    assert saved['TTT->TTC']['12'] == pytest.approx(projected['TTT->TTC'][12])
+
+
+@pytest.mark.parametrize('backend', ['hypergeom', 'logspace'])
+@pytest.mark.parametrize('original_size, sample_size', [(10, 4), (25, 25), (60, 7), (9, 0)])
+def test_banded_projection_matches_dense(backend, original_size, sample_size):
+    rng = np.random.default_rng(original_size)
+    sfs = rng.integers(0, 20, original_size + 1) * (rng.random(original_size + 1) < 0.5)
+    dense = downsample_sfs(sfs, original_size, sample_size, backend)
+    banded = downsample_sfs(sfs, original_size, sample_size, backend, banded=True)
+    np.testing.assert_allclose(banded, dense, rtol=1e-10, atol=1e-12)
+
+
+def test_banded_projections_share_the_byte_budget():
+    cache = ProjectionCache(max_bytes=2**20)
+    banded = cache.get_banded(200, 50)
+    # Only the band is computed, not the dense matrix
+    assert list(cache.matrices) == [(200, 50, 'hypergeom', 'float64', 'banded')]
+    assert cache.nbytes == banded.nbytes
+    assert not banded.values.flags.writeable
+
+    for original_size in range(201, 240):
+        cache.get_banded(original_size, 50)
+    assert cache.nbytes <= cache.max_bytes
+    assert (200, 50, 'hypergeom', 'float64', 'banded') not in cache.matrices
+
+
+@pytest.mark.parametrize('batched, cascade', [(True, False), (True, True), (False, False)])
+def test_repeated_target_sizes_are_projected_once(batched, cascade):
+    sfs_dict = make_sfs_dict(2)
+    repeated = downsample_codon_change_sfs_in_dict(sfs_dict, [12, 12, 6], batched=batched, cascade=cascade)
+    unique = downsample_codon_change_sfs_in_dict(sfs_dict, [12, 6], batched=batched, cascade=cascade)
+    assert repeated == unique
+
+
+@pytest.mark.parametrize('cascade', [False, True])
+def test_parallel_projection_matches_serial(cascade):
+    sfs_dict = make_sfs_dict(3)
+    targets = [20, 12, 6]
+    parallel = downsample_codon_change_sfs_in_dict(sfs_dict, targets, cascade=cascade, workers=2)
+    serial = downsample_codon_change_sfs_in_dict(sfs_dict, targets, cascade=cascade, workers=1)
+    one_by_one = downsample_codon_change_sfs_in_dict(sfs_dict, targets, batched=False)
+
+    assert list(parallel) == list(serial) == list(sfs_dict)
+    for change in sfs_dict:
+        assert list(parallel[change]) == targets
+        for m in targets:
+            # Shards are multiplied separately, so only the last bits may differ
+            np.testing.assert_allclose(parallel[change][m], serial[change][m], rtol=1e-12, atol=1e-12)
+            np.testing.assert_allclose(parallel[change][m], one_by_one[change][m], rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('batched, cascade, workers', [(True, False, 1), (True, True, 1), (True, False, 2),
+                                                       (False, False, 1)])
+def test_banded_codon_change_projection_matches_dense(batched, cascade, workers):
+    sfs_dict = make_sfs_dict(4)
+    targets = [20, 12, 6]
+    banded = downsample_codon_change_sfs_in_dict(sfs_dict, targets, batched=batched, cascade=cascade,
+                                                 workers=workers, banded=True)
+    dense = downsample_codon_change_sfs_in_dict(sfs_dict, targets, batched=batched, cascade=cascade)
+
+    assert list(banded) == list(dense)
+    for change in sfs_dict:
+        assert list(banded[change]) == targets
+        for m in targets:
+            np.testing.assert_allclose(banded[change][m], dense[change][m], rtol=1e-12, atol=1e-12)
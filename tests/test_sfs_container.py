@@ -0,0 +1,83 @@
+"""
+Tests for sfs_container.
+"""
+
+import numpy as np
+import pytest
+from codon_analyses import create_codon_change_sfs_dict
+from data_processing import process_main_table
+from sfs_analyses import downsample_codon_change_sfs_in_dict
+from sfs_container import CodonChangeSFS
+
+
+@pytest.fixture
+def sfs_dict(main_table, swap_pairs) -> dict:
+    return create_codon_change_sfs_dict(process_main_table(main_table, swap_pairs), use_filter=False)
+
+
+def test_round_trip_rebuilds_the_dict_exactly(sfs_dict):
+    sfs = CodonChangeSFS.from_dict(sfs_dict)
+    assert sfs.data.dtype == np.uint32
+    rebuilt = sfs.to_dict()
+
+    assert rebuilt == sfs_dict
+    assert list(rebuilt) == list(sfs_dict)
+    for change in sfs_dict:
+        assert list(rebuilt[change]) == list(sfs_dict[change])
+        assert sfs.sample_sizes(change) == sorted(sfs_dict[change])
+        for size, counts in sfs_dict[change].items():
+            np.testing.assert_array_equal(sfs[change, size], counts)
+            assert (change, size) in sfs
+
+
+def test_projected_round_trip(sfs_dict):
+    projected = downsample_codon_change_sfs_in_dict(sfs_dict, [10, 6])
+    sfs = CodonChangeSFS.from_dict(projected)
+    assert sfs.data.dtype == np.float64
+    assert sfs.to_dict() == projected
+
+
+def test_select(sfs_dict):
+    sfs = CodonChangeSFS.from_dict(sfs_dict)
+    changes = list(sfs_dict)[10:2:-3]
+    sizes = sfs.sample_sizes()[::2]
+
+    selected = sfs.select(changes, sizes)
+    assert selected.codon_changes == changes
+    assert selected.to_dict() == {change: {size: counts for size, counts in sfs_dict[change].items() if size in sizes}
+                                  for change in changes}
+    assert sfs.select(sample_sizes=sizes).to_dict() == sfs.select(list(sfs_dict), sizes).to_dict()
+
+
+def test_sum_by_sample_size_and_totals(sfs_dict):
+    sfs = CodonChangeSFS.from_dict(sfs_dict)
+    sums = sfs.sum_by_sample_size()
+    assert list(sums) == sfs.sample_sizes()
+    for size, total in sums.items():
+        expected = sum(np.asarray(size_data[size]) for size_data in sfs_dict.values() if size in size_data)
+        np.testing.assert_array_equal(total, expected)
+
+    assert sfs.totals() == {change: sum(sum(counts) for counts in size_data.values())
+                            for change, size_data in sfs_dict.items()}
+
+
+def test_padded(sfs_dict):
+    sfs = CodonChangeSFS.from_dict(sfs_dict)
+    tensor, sizes = sfs.padded()
+    assert sizes == sfs.sample_sizes()
+    assert tensor.shape == (len(sfs_dict), len(sizes), max(sizes) + 1)
+
+    expected = np.zeros_like(tensor)
+    for code, change in enumerate(sfs_dict):
+        for size, counts in sfs_dict[change].items():
+            expected[code, sizes.index(size), :size + 1] = counts
+    np.testing.assert_array_equal(tensor, expected)
+
+    subset, subset_sizes = sfs.padded([sizes[-1], sizes[0]])
+    assert subset_sizes == [sizes[0], sizes[-1]]
+    np.testing.assert_array_equal(subset, expected[:, [0, -1], :sizes[-1] + 1])
+
+
+def test_wrong_number_of_bins_raises():
+    with pytest.raises(ValueError):
+        CodonChangeSFS.from_dict({'TTT->TTC': {4: [1, 2, 3]}})
@@ -0,0 +1,63 @@
+"""
+Tests for sfs_io and the save_data/load_data helpers.
+"""
+
+import json
+import numpy as np
+import pytest
+import codon_analyses
+import sfs_analyses
+from sfs_io import load_sfs, save_sfs
+
+
+def make_count_dict() -> dict:
+    """
+    Function to make a codon change SFS dictionary of counts, with an
+    empty codon change and sample sizes in non-sorted order.
+    """
+    rng = np.random.default_rng(0)
+    return {
+        'TTT->TTC': {12: rng.integers(0, 9, 13).tolist(), 7: rng.integers(0, 9, 8).tolist()},
+        'TTC->TTT': {},
+        'GGA->GGG': {30: rng.integers(0, 9, 31).tolist()}
+    }
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_save_and_lazy_load(tmp_path, compress):
+    data = make_count_dict()
+    path = str(tmp_path / 'sfs.npz')
+    save_sfs(data, path, compress=compress)
+
+    with load_sfs(path) as sfs_file:
+        # Only the index is read on opening
+        assert list(sfs_file) == list(data) and len(sfs_file) == 3
+        assert not sfs_file._loaded
+        assert sfs_file.sample_sizes('TTT->TTC') == [12, 7]
+        assert 'TTT->TTC' in sfs_file and 'AAA->AAG' not in sfs_file
+
+        np.testing.assert_array_equal(sfs_file['GGA->GGG', 30], data['GGA->GGG'][30])
+        assert list(sfs_file._loaded) == [2]
+        assert sfs_file['TTC->TTT'] == {}
+
+        assert sfs_file.to_dict() == data
+
+
+def test_projected_sfs_round_trip(tmp_path):
+    projected = sfs_analyses.downsample_codon_change_sfs_in_dict(make_count_dict(), [10, 5])
+    path = str(tmp_path / 'projected.npz')
+    save_sfs(projected, path)
+    with load_sfs(path) as sfs_file:
+        assert sfs_file.to_dict() == projected
+
+
+@pytest.mark.parametrize('module', [codon_analyses, sfs_analyses])
+@pytest.mark.parametrize('suffix', ['.pkl', '.npz'])
+def test_save_data_keeps_pickle_file_keyword(tmp_path, module, suffix):
+    data = make_count_dict()
+    path = str(tmp_path / f'sfs{suffix}')
+    module.save_data(data, pickle_file=path, json_file=str(tmp_path / 'sfs.json'))
+
+    assert sfs_analyses.load_data(path) == data
+    with open(tmp_path / 'sfs.json') as f:
+        assert json.load(f)['TTT->TTC'] == {str(size): sfs for size, sfs in data['TTT->TTC'].items()}
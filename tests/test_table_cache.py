@@ -0,0 +1,41 @@
+"""
+Tests for table_cache.
+"""
+
+import os
+import pandas as pd
+import table_cache
+from table_cache import ProcessedTableCache
+
+
+def test_file_digests_are_memoised(tmp_path, monkeypatch):
+    cache = ProcessedTableCache(str(tmp_path / 'cache'))
+    input_file = tmp_path / 'scores.csv'
+    input_file.write_text('chromosome,position,score\nchr2L,1,0.5\n')
+
+    calls = []
+    hash_file = table_cache.hash_file
+    monkeypatch.setattr(table_cache, 'hash_file', lambda path: calls.append(path) or hash_file(path))
+
+    first = cache.key((str(input_file),), [])
+    assert ProcessedTableCache(str(tmp_path / 'cache')).key((str(input_file),), []) == first
+    assert len(calls) == 1
+
+    # A changed file is hashed again
+    input_file.write_text('chromosome,position,score\nchr2L,1,1.5\n')
+    os.utime(input_file, ns=(0, 10**9))
+    assert cache.key((str(input_file),), []) != first
+    assert len(calls) == 2
+
+
+def test_eviction_tolerates_entries_removed_by_another_worker(tmp_path, monkeypatch):
+    cache = ProcessedTableCache(str(tmp_path), max_bytes=0)
+    cache.put('a', pd.DataFrame({'x': [1]}))
+    cache.put('b', pd.DataFrame({'x': [2]}))
+
+    # Simulate another worker removing the entries between listing and removal
+    entries = [(os.path.join(str(tmp_path), 'gone.pkl'), 10, 0.0)]
+    monkeypatch.setattr(cache, 'entries', lambda: entries)
+    cache.evict()
+    assert cache.get('gone') is None
+    cache.invalidate('gone')
@@ -0,0 +1,128 @@
+"""
+Tests for tsv_streaming.
+"""
+
+import gzip
+import os
+import numpy as np
+import pytest
+from genetic_code import synonymous_1nt_pairs
+from tsv_streaming import (SFSSink, ListSink, count_sfs_lines, extract_snps_tsv_parallel, read_byte_range,
+                           route_snps_tsv, sfs_from_tsv, sfs_from_tsv_parallel, split_byte_ranges)
+
+EFFECTS = ['SYNONYMOUS_CODING', 'NON_SYNONYMOUS_CODING', 'INTERGENIC', 'UPSTREAM', 'DOWNSTREAM']
+
+
+def make_raw_lines(n: int = 400, seed: int = 0) -> list:
+    """
+    Function to make raw .TSV lines with random rooting, effects and codon changes.
+    """
+    rng = np.random.default_rng(seed)
+    lines = []
+    for pos in range(1, n + 1):
+        total = int(rng.integers(5, 40))
+        alt = int(rng.integers(1, total))
+        refcodon, altcodon = synonymous_1nt_pairs[rng.integers(0, len(synonymous_1nt_pairs))].split('->')
+        if rng.random() < 0.05:
+            refcodon = 'NA'
+        refcontext, altcontext = (''.join(rng.choice(list('ACGT'), 7)) for _ in range(2))
+        fields = ['chr2L', pos, rng.choice(['root_ref', 'root_alt', 'NA']), 'A', 'G',
+                  'F', 'L', 'g', 't', '+', total - alt, alt, total, refcontext, altcontext,
+                  'ACGTT', 'ACATT', refcodon.lower(), altcodon, rng.choice(EFFECTS)]
+        lines.append('\t'.join(map(str, fields)) + '\n')
+    return lines
+
+
+def rooted_histograms(lines: list, functional_effect: str) -> dict:
+    """
+    Function to count rooted SFSs of raw lines field by field, as reference.
+    """
+    histograms = {change: {} for change in synonymous_1nt_pairs}
+    for line in lines:
+        fields = line.rstrip('\n').split('\t')
+        if fields[19] != functional_effect:
+            continue
+        if fields[2] == 'root_alt':
+            derived, change = int(fields[10]), f"{fields[18].upper()}->{fields[17].upper()}"
+        else:
+            derived, change = int(fields[11]), f"{fields[17].upper()}->{fields[18].upper()}"
+        if change in histograms:
+            total = int(fields[12])
+            histograms[change].setdefault(total, [0] * (total + 1))[derived] += 1
+    return histograms
+
+
+@pytest.fixture
+def raw_tsv(tmp_path):
+    path = tmp_path / 'chr2L_tables.tsv'
+    lines = make_raw_lines()
+    path.write_text(''.join(lines))
+    return str(path), lines
+
+
+def test_sfs_from_tsv_matches_field_rooting(raw_tsv):
+    path, lines = raw_tsv
+    expected = rooted_histograms(lines, 'SYNONYMOUS_CODING')
+    result = sfs_from_tsv(path).to_dict()
+    for change in synonymous_1nt_pairs:
+        assert {n: list(sfs) for n, sfs in result.get(change, {}).items()} == expected[change]
+
+
+def test_sfs_sink_matches_sfs_from_tsv(raw_tsv):
+    path, _ = raw_tsv
+    sink = SFSSink()
+    route_snps_tsv(path, {'SYNONYMOUS_CODING': sink})
+    assert sink.to_accumulator().to_dict() == sfs_from_tsv(path).to_dict()
+
+
+def test_noncoding_records_use_mutational_change(raw_tsv):
+    path, lines = raw_tsv
+    sinks = {effect: ListSink() for effect in EFFECTS}
+    route_snps_tsv(path, sinks)
+
+    raw_fields = {fields[1]: fields for fields in (line.rstrip('\n').split('\t') for line in lines)}
+    for effect in ('INTERGENIC', 'UPSTREAM', 'DOWNSTREAM'):
+        assert sinks[effect].records
+        for record in sinks[effect].records:
+            fields = raw_fields[record[1]]
+            contexts = [fields[13][2:5], fields[14][2:5]]
+            if fields[2] == 'root_alt':
+                contexts.reverse()
+            assert record[11] == '->'.join(contexts)
+
+    for record in sinks['SYNONYMOUS_CODING'].records:
+        assert record[11] == f"{record[9]}->{record[10]}"
+
+
+@pytest.mark.parametrize('altcount, totalcount', [('12', '10'), ('-1', '10'), ('NA', '10'), ('2', 'NA')])
+def test_invalid_counts_raise(altcount, totalcount):
+    fields = make_raw_lines(1)[0].rstrip('\n').split('\t')
+    fields[2], fields[11], fields[12] = 'root_ref', altcount, totalcount
+    fields[17], fields[18], fields[19] = 'TTT', 'TTC', 'SYNONYMOUS_CODING'
+    with pytest.raises(ValueError, match=r'chr2L:1 \(TTT->TTC\)'):
+        count_sfs_lines(['\t'.join(fields) + '\n'], {'TTT->TTC': {}})
+
+
+@pytest.mark.parametrize('compressed', [False, True])
+def test_parallel_streaming_matches_serial(raw_tsv, tmp_path, compressed):
+    path, lines = raw_tsv
+    if compressed:
+        path = str(tmp_path / 'chr2L_tables.tsv.gz')
+        with gzip.open(path, 'wt') as f:
+            f.write('#header\n' + ''.join(lines))
+
+    serial = sfs_from_tsv(path).to_dict()
+    assert sfs_from_tsv_parallel(path, workers=2, shards_per_worker=3).to_dict() == serial
+
+    sink = ListSink()
+    route_snps_tsv(path, {'INTERGENIC': sink})
+    assert extract_snps_tsv_parallel(path, 'INTERGENIC', workers=2, shards_per_worker=3) == sink.records
+    assert sink.records
+
+
+def test_byte_ranges_cover_every_line_once(raw_tsv):
+    path, lines = raw_tsv
+    ranges = split_byte_ranges(path, 7)
+    assert ranges[0][0] == 0 and ranges[-1][1] == os.path.getsize(path)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert [line for start, end in ranges for line in read_byte_range(path, start, end)] == lines